@@ -0,0 +1,57 @@
+import sys
+import json
+import argparse
+
+def compare(baseline, current, tolerance=0.1, stat='p50_ms'):
+    """Compares two benchmark reports and flags the benchmarks that got slower.
+    
+    Arguments:
+        baseline {dict} -- reference report (see benchmarks.run)
+        current {dict} -- report to check
+    
+    Keyword Arguments:
+        tolerance {float} -- allowed relative slowdown (default: {0.1})
+        stat {string} -- statistic to compare (default: {'p50_ms'})
+    
+    Returns:
+        list[tuple] -- (name, baseline, current, ratio, is_regression) of each common benchmark
+    """
+    rows = []
+    for name, stats in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name][stat]
+        after = stats[stat]
+        ratio = after / before if before > 0 else 1.0
+        rows.append((name, before, after, ratio, ratio > 1 + tolerance))
+    return rows
+
+def get_arg_parser():
+    """Routine for parsing the flags
+    
+    Returns:
+        arg_parser: the argument parser
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.compare')
+    parser.add_argument('baseline', help="reference benchmark results")
+    parser.add_argument('current', help="benchmark results to check")
+    parser.add_argument('-t', '--tolerance', type=float, default=0.1, help="allowed relative slowdown")
+    parser.add_argument('--stat', default='p50_ms', help="statistic to compare")
+    return parser
+
+if __name__ == "__main__":
+    args = vars(get_arg_parser().parse_args())
+    with open(args['baseline']) as file:
+        baseline = json.load(file)
+    with open(args['current']) as file:
+        current = json.load(file)
+
+    rows = compare(baseline, current, tolerance=args['tolerance'], stat=args['stat'])
+    for name, before, after, ratio, regression in rows:
+        flag = 'SLOWER' if regression else ''
+        print('{:<28} {:>10.3f} -> {:>10.3f} ms  x{:.2f} {}'.format(name, before, after, ratio, flag))
+
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print('\n', len(regressions), ' benchmark(s) slower than the tolerance (', args['tolerance'], ')', sep='')
+        sys.exit(1)
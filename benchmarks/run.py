@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.feature_extraction.text import TfidfVectorizer
+from movieclassifier.model.Model import Model
+from movieclassifier.model.OvRModel import OvRModel
+from movieclassifier.model.HashingOvRModel import HashingOvRModel
+from movieclassifier.model.artifact import save_artifact
+from movieclassifier.preprocessing.data_preprocessing import process_data
+from movieclassifier.preprocessing.text_preprocessing import TextPipeline, process_text, to_lower, to_ascii, remove_specials, \
+    word_tokenize, TOKENIZERS
+from benchmarks.synthetic import make_records, make_raw_data
+
+BATCH_SIZES = [1, 8, 64, 512]
+JOBS = [1, 2, 4, 8]
+
+def summarize(times, n_items=1):
+    """Computes the latency percentiles and the throughput of a list of timings.
+    
+    Arguments:
+        times {list[float]} -- duration (s) of each run
+    
+    Keyword Arguments:
+        n_items {int} -- number of items processed by each run (default: {1})
+    
+    Returns:
+        dict -- latency statistics (ms) and throughput (items/s)
+    """
+    times_ms = np.array(times) * 1000
+    return {
+        'runs': len(times),
+        'mean_ms': float(times_ms.mean()),
+        'p50_ms': float(np.percentile(times_ms, 50)),
+        'p95_ms': float(np.percentile(times_ms, 95)),
+        'p99_ms': float(np.percentile(times_ms, 99)),
+        'throughput': float(n_items * len(times) / (times_ms.sum() / 1000)),
+    }
+
+def measure(fn, inputs, n_items=1):
+    """Times fn on every input.
+    
+    Arguments:
+        fn {callable} -- function to benchmark
+        inputs {iterable} -- argument of each run
+    
+    Keyword Arguments:
+        n_items {int} -- number of items processed by each run (default: {1})
+    
+    Returns:
+        dict -- latency statistics, see summarize
+    """
+    times = []
+    for arg in inputs:
+        start_time = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start_time)
+    return summarize(times, n_items)
+
+def repeat(fn, n_runs, n_items=1):
+    """Times n_runs calls of fn without arguments.
+    """
+    return measure(lambda _: fn(), range(n_runs), n_items)
+
+def bench_text(texts):
+    pipeline = TextPipeline()
+    # load the lazy resources before timing
+    pipeline.process(texts[0], lemmatise=True)
+
+    results = {'process_text': measure(process_text, texts)}
+
+    lowered = [to_lower(text) for text in texts]
+    ascii_texts = [to_ascii(text) for text in lowered]
+    cleaned = [remove_specials(text) for text in ascii_texts]
+    # the tokenizer of the pipeline (regex by default), and nltk for comparison
+    tokenize = TOKENIZERS[pipeline.tokenizer]
+    tokens = [tokenize(text) for text in cleaned]
+    no_stopwords = [pipeline.remove_stopwords(toks) for toks in tokens]
+    numbers = [pipeline.replace_nums2words(toks) for toks in no_stopwords]
+
+    results['step.1_lowercase'] = measure(to_lower, texts)
+    results['step.2_ascii'] = measure(to_ascii, lowered)
+    results['step.3_specials'] = measure(remove_specials, ascii_texts)
+    results['step.4_tokenization'] = measure(tokenize, cleaned)
+    results['step.4_tokenization.nltk'] = measure(word_tokenize, cleaned)
+    results['step.5_stopwords'] = measure(pipeline.remove_stopwords, tokens)
+    results['step.6_num2words'] = measure(pipeline.replace_nums2words, no_stopwords)
+    results['step.7_lemmatisation'] = measure(pipeline.lemmatisation, numbers)
+    return results
+
+def bench_model(x, y, n_runs):
+    results = {}
+    vectorizer = TfidfVectorizer(max_df=0.8, max_features=100000)
+    results['tfidf.fit'] = repeat(lambda: TfidfVectorizer(max_df=0.8, max_features=100000).fit(x), n_runs, len(x))
+    vectorizer.fit(x)
+    results['tfidf.transform'] = repeat(lambda: vectorizer.transform(x), n_runs, len(x))
+
+    def fit():
+        model = OvRModel(LogisticRegression(solver='saga', max_iter=1000), threshold=0.2)
+        model.fit(x, y)
+        return model
+    results['ovr.fit'] = repeat(fit, max(1, n_runs // 5), len(x))
+    model = fit()
+
+    # wall time of the training with the genres fitted in parallel
+    X = vectorizer.transform(x)
+    Y = model.binarizer.transform(y)
+    for n_jobs in JOBS:
+        if n_jobs > os.cpu_count():
+            continue
+        def fit_parallel():
+            model = OvRModel(LogisticRegression(solver='saga', max_iter=1000, random_state=42), \
+                threshold=0.2, test_mode=True, n_jobs=n_jobs)
+            model.fit(X, Y)
+        results['ovr.fit.jobs_' + str(n_jobs)] = repeat(fit_parallel, max(1, n_runs // 5), len(x))
+
+    for size in BATCH_SIZES:
+        if size > len(x):
+            continue
+        batches = [x.iloc[i:i + size] for i in range(0, len(x) - size + 1, size)][:200]
+        if size == 1:
+            batches = [[batch.iloc[0]] for batch in batches]
+        results['ovr.predict.batch_' + str(size)] = measure(model.predict, batches, size)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_path = os.path.join(tmp_dir, 'model.hal')
+        artifact_path = os.path.join(tmp_dir, 'model_arrays')
+        model.save(pickle_path)
+        save_artifact(model, artifact_path)
+        results['model.load.pickle'] = repeat(lambda: Model.load(pickle_path), n_runs)
+        results['model.load.artifact'] = repeat(lambda: Model.load(artifact_path), n_runs)
+    return results
+
+def compare_models(x, y, n_runs):
+    """Compares the size, the loading time and the F1 score of the model variants.
+    
+    Arguments:
+        x {pandas.Series} -- processed texts
+        y {list[list]} -- genres of each text
+        n_runs {int} -- number of loadings
+    
+    Returns:
+        dict -- size (bytes), loading time (ms) and F1 score of each variant
+    """
+    n_train = int(len(x) * 0.8)
+    variants = {
+        'OvRModel': lambda: OvRModel(LogisticRegression(solver='saga', max_iter=1000), threshold=0.2),
+        'HashingOvRModel': lambda: HashingOvRModel(LogisticRegression(solver='saga', max_iter=1000), threshold=0.2),
+    }
+    comparison = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, make_model in variants.items():
+            model = make_model()
+            model.fit(x[:n_train], y[:n_train])
+            path = os.path.join(tmp_dir, name + '.hal')
+            model.save(path)
+            comparison[name] = {
+                'size_bytes': os.path.getsize(path),
+                'load_ms': repeat(lambda: Model.load(path), n_runs)['p50_ms'],
+                'f1': model.get_stats(x[n_train:], y[n_train:])['F1 score'],
+            }
+    return comparison
+
+def run(n_records=2000, n_runs=10, seed=42):
+    """Runs the whole benchmark suite on synthetic data.
+    
+    Keyword Arguments:
+        n_records {int} -- number of synthetic movies (default: {2000})
+        n_runs {int} -- number of runs of the slower benchmarks (default: {10})
+        seed {int} -- seed of the synthetic data (default: {42})
+    
+    Returns:
+        dict -- metadata of the run and the statistics of each benchmark
+    """
+    records = make_records(n_records, seed)
+    raw = make_raw_data(n_records, seed)
+
+    results = bench_text(list(records['overview']))
+    results['process_data'] = repeat(lambda: process_data(raw.copy()), n_runs, len(raw))
+
+    x = records['title'].str.lower() + ' ' + records['overview'].apply(process_text)
+    results.update(bench_model(x, list(records['genres']), n_runs))
+    models = compare_models(x, list(records['genres']), n_runs)
+
+    meta = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'n_records': n_records,
+        'n_runs': n_runs,
+        'seed': seed,
+    }
+    return {'meta': meta, 'results': results, 'models': models}
+
+def get_arg_parser():
+    """Routine for parsing the flags
+    
+    Returns:
+        arg_parser: the argument parser
+    """
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run')
+    parser.add_argument('-o', '--output', default='benchmark.json', help="file to save the results to")
+    parser.add_argument('-n', '--records', type=int, default=2000, help="number of synthetic movies")
+    parser.add_argument('-r', '--runs', type=int, default=10, help="number of runs of the slower benchmarks")
+    parser.add_argument('--seed', type=int, default=42, help="seed of the synthetic data")
+    return parser
+
+if __name__ == "__main__":
+    args = vars(get_arg_parser().parse_args())
+    report = run(n_records=args['records'], n_runs=args['runs'], seed=args['seed'])
+
+    for name, stats in report['results'].items():
+        print('{:<28} p50 {:>10.3f} ms  p99 {:>10.3f} ms  {:>12.1f} items/s'.format( \
+            name, stats['p50_ms'], stats['p99_ms'], stats['throughput']))
+
+    print()
+    for name, stats in report['models'].items():
+        print('{:<28} size {:>10.1f} kB  load {:>10.3f} ms  F1 {:.3f}'.format( \
+            name, stats['size_bytes'] / 1024, stats['load_ms'], stats['f1']))
+
+    with open(args['output'], 'w') as file:
+        json.dump(report, file, indent=2)
+    print('\nResults saved as \'', args['output'], '\'', sep='', file=sys.stderr)
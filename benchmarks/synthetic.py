@@ -0,0 +1,76 @@
+import random
+import pandas as pd
+
+GENRES = {
+    'Action': ['explosion', 'chase', 'agent', 'mission', 'fight', 'weapon', 'escape', 'soldier'],
+    'Comedy': ['funny', 'wedding', 'awkward', 'party', 'neighbour', 'prank', 'roommate', 'misadventure'],
+    'Crime': ['detective', 'robbery', 'gangster', 'murder', 'heist', 'police', 'mafia', 'prison'],
+    'Drama': ['family', 'struggle', 'illness', 'memory', 'divorce', 'grief', 'dream', 'father'],
+    'Horror': ['haunted', 'demon', 'curse', 'creature', 'blood', 'possessed', 'nightmare', 'ritual'],
+    'Romance': ['love', 'kiss', 'heart', 'affair', 'summer', 'letter', 'marriage', 'passion'],
+    'Science Fiction': ['alien', 'planet', 'spaceship', 'robot', 'future', 'galaxy', 'experiment', 'clone'],
+    'Animation': ['toy', 'magical', 'talking', 'kingdom', 'princess', 'dragon', 'forest', 'adventure'],
+}
+FILLER = ['the', 'a', 'young', 'man', 'woman', 'town', 'city', 'must', 'find', 'their', 'new', 'old', \
+    'life', 'after', 'before', 'world', 'secret', 'friend', 'group', 'discover', 'journey', 'while', \
+    'during', 'war', 'night', 'day', 'story', 'mysterious', 'small', 'against', 'time', 'team']
+
+def make_overview(rng, genres, n_words):
+    words = []
+    for _ in range(n_words):
+        choice = rng.random()
+        if choice < 0.35:
+            words.append(rng.choice(GENRES[rng.choice(genres)]))
+        elif choice < 0.38:
+            words.append(str(rng.choice([2, 3, 10, 1947, 1999, 2020])))
+        else:
+            words.append(rng.choice(FILLER))
+    text = ' '.join(words)
+    return text[0].upper() + text[1:] + ', and more-or-less everything changes.'
+
+def make_records(n_records, seed=42):
+    """Generates synthetic movies, shaped like the cleaned dataset (title, overview and a
+    list of genres), whose words are correlated with their genres.
+    
+    Arguments:
+        n_records {int} -- number of movies
+    
+    Keyword Arguments:
+        seed {int} -- seed of the random generator (default: {42})
+    
+    Returns:
+        pandas.DataFrame -- title, overview and genres of each movie
+    """
+    rng = random.Random(seed)
+    names = list(GENRES)
+    rows = []
+    for i in range(n_records):
+        genres = sorted(rng.sample(names, rng.randint(1, 3)))
+        title = ' '.join(rng.choice(GENRES[g]) for g in genres).title() + ' ' + str(i)
+        rows.append({'title': title, 'overview': make_overview(rng, genres, rng.randint(20, 60)), 'genres': genres})
+    return pd.DataFrame(rows)
+
+def make_raw_data(n_records, seed=42):
+    """Generates a synthetic raw dataframe, shaped like the MovieLens metadata file, with
+    duplicates, missing values and missing overviews to be cleaned by process_data.
+    
+    Arguments:
+        n_records {int} -- number of movies
+    
+    Keyword Arguments:
+        seed {int} -- seed of the random generator (default: {42})
+    
+    Returns:
+        pandas.DataFrame -- release_date, title, overview and genres of each movie
+    """
+    rng = random.Random(seed)
+    df = make_records(n_records, seed)
+    ids = {name: i for i, name in enumerate(GENRES)}
+    df['genres'] = df['genres'].apply(lambda genres: str([{'id': ids[g], 'name': g} for g in genres]))
+    df['release_date'] = [str(rng.randint(1920, 2020)) + '-01-01' for _ in range(n_records)]
+    for i in range(0, n_records, 50):
+        df.loc[i, 'overview'] = rng.choice(['No overview found.', 'Not Available', '', None])
+    for i in range(25, n_records, 100):
+        df.loc[i, 'genres'] = '[]'
+    df = pd.concat([df, df.iloc[::40]], ignore_index=True)
+    return df[['release_date', 'title', 'overview', 'genres']]
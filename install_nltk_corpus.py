@@ -3,4 +3,3 @@ import nltk
 nltk.download('punkt')
 nltk.download('wordnet')
 nltk.download('averaged_perceptron_tagger')
-nltk.download('stopwords')
\ No newline at end of file
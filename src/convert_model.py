@@ -0,0 +1,61 @@
+import os
+import argparse
+from pathlib import Path
+from sklearn.model_selection import train_test_split
+from movieclassifier.model.Model import Model
+from movieclassifier.model.artifact import save_artifact
+from movieclassifier.preprocessing.data_preprocessing import load_data, data_format, CSV
+
+THIS_PATH = os.path.dirname(os.path.realpath(__file__))
+PROJECT_ROOT = str(Path(THIS_PATH).parent)
+DEFAULT_LOAD_PATH = PROJECT_ROOT + '/models/model.hal'
+DEFAULT_SAVE_PATH = PROJECT_ROOT + '/models/model_arrays'
+
+def get_arg_parser():
+    """Routine for parsing the flags
+    
+    Returns:
+        arg_parser: the argument parser
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-f', '--filepath', default=DEFAULT_LOAD_PATH, help='pickled model to convert')
+    parser.add_argument('-s', '--savepath', default=DEFAULT_SAVE_PATH, help="directory to save the converted model to")
+    parser.add_argument('--prune', type=float, default=None, help="remove the terms whose weights are below this value for every genre")
+    parser.add_argument('--int8', action='store_true', help="quantize the weights to int8")
+    parser.add_argument('-d', '--data', default=None, help="prepared data the model was trained on, to compare the F1 score " + \
+        "of its test set before and after the compression")
+    parser.add_argument('--testsize', type=float, default=0.2, help="size of the test set, as given to training.py " + \
+        "(1 if the data is held out entirely)")
+    return parser
+
+def print_compression_report(report):
+    """Prints the size and the F1 score of the model before and after the compression.
+    
+    Arguments:
+        report {dict} -- report of OvRModel.compress
+    """
+    for name, (before, after) in report.items():
+        change = (after - before) / before if before else 0
+        print(name, ': ', round(before, 4), ' -> ', round(after, 4), ' (', '{:+.1%}'.format(change), ')', sep='')
+
+if __name__ == "__main__":
+    argparser = get_arg_parser()
+    args = vars(argparser.parse_args())
+
+    model = Model.load(args['filepath'])
+
+    if args['prune'] is not None or args['int8']:
+        x_test, y_test = None, None
+        if args['data']:
+            df = load_data(args['data'])
+            x_test = df['title'].astype(str).str.lower() + ' ' + df['overview']
+            y_test = df['genres'].str.split(',') if data_format(args['data']) == CSV else df['genres']
+            # the same test set as training.py, so that the training rows are left out
+            if args['testsize'] < 1:
+                _, x_test, _, y_test = train_test_split(x_test, y_test, test_size=args['testsize'], random_state=42)
+        report = model.compress(cutoff=args['prune'], int8=args['int8'], X_test=x_test, y_test=y_test)
+        print_compression_report(report)
+
+    save_artifact(model, args['savepath'])
+
+    print("Model converted and saved in \'", args['savepath'], "\'", sep='')
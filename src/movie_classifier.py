@@ -1,6 +1,7 @@
 import argparse
 from pathlib import Path
 import os
+import sys
 import json
 from movieclassifier.model.Model import Model
 import time
@@ -8,6 +9,7 @@ import time
 THIS_PATH = os.path.dirname(os.path.realpath(__file__))
 PROJECT_ROOT = str(Path(THIS_PATH).parent)
 DEFAULT_MODEL = PROJECT_ROOT + '/models/model.hal'
+MODEL_HELP = "model to use: a pickled model, or the directory of a converted one (see convert_model.py)"
 
 def get_arg_parser():
     """Routine for parsing the flags
@@ -17,12 +19,48 @@ def get_arg_parser():
     """
     parser = argparse.ArgumentParser()
 
-    parser.add_argument('-m', '--model', default=DEFAULT_MODEL, help="model to use")
+    parser.add_argument('-m', '--model', default=DEFAULT_MODEL, help=MODEL_HELP)
     parser.add_argument('-t', '--title', required=True, help="title of the movie")
     parser.add_argument('-d', '--description', required=True, help='description of the movie')
     parser.add_argument('-v', '--verbose', help='verbose mode', action='store_true')
     return parser
 
+def get_serve_arg_parser():
+    """Routine for parsing the flags of the serving mode
+    
+    Returns:
+        arg_parser: the argument parser
+    """
+    parser = argparse.ArgumentParser(prog='movie_classifier.py serve')
+
+    parser.add_argument('-m', '--model', default=DEFAULT_MODEL, help=MODEL_HELP)
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('-p', '--port', type=int, default=8000, help="port to listen on")
+    parser.add_argument('-q', '--quiet', help='hide the request log', action='store_true')
+    parser.add_argument('--batch-size', type=int, default=1, help="maximum requests per micro-batch (1 disables batching)")
+    parser.add_argument('--batch-wait', type=float, default=0.005, help="maximum seconds a request waits for its batch")
+    parser.add_argument('--cache-size', type=int, default=0, help="maximum number of cached predictions (0 disables the cache)")
+    parser.add_argument('--metrics', help='record the stage timings, exported at /metrics', action='store_true')
+    return parser
+
+def get_batch_arg_parser():
+    """Routine for parsing the flags of the batch mode
+    
+    Returns:
+        arg_parser: the argument parser
+    """
+    parser = argparse.ArgumentParser(prog='movie_classifier.py batch')
+
+    parser.add_argument('-m', '--model', default=DEFAULT_MODEL, help=MODEL_HELP)
+    parser.add_argument('-i', '--input', default='-', help="csv or jsonl file with title and description (- for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="jsonl file to write the predictions to (- for stdout)")
+    parser.add_argument('-f', '--format', choices=['csv', 'jsonl'], default=None, help="input format (default: from the extension, jsonl for stdin)")
+    parser.add_argument('-c', '--chunksize', type=int, default=1000, help="number of movies predicted together")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help="number of processes for text preprocessing")
+    parser.add_argument('--cache-size', type=int, default=0, help="maximum number of cached predictions (0 disables the cache)")
+    parser.add_argument('--metrics', default=None, help="json file to save the stage timings to")
+    return parser
+
 def predict(title, desc, model, verbose=False):
     """Makes a prediction of a movie's genres based on the title and a description.
     
@@ -42,7 +80,67 @@ def predict(title, desc, model, verbose=False):
     jdata = json.dumps(output)
     return jdata
 
+def serve_main(argv):
+    """Runs the prediction server, so that the model is loaded only once.
+    
+    Arguments:
+        argv {list[string]} -- command line arguments of the serving mode
+    """
+    from movieclassifier.serving.server import serve
+    args = vars(get_serve_arg_parser().parse_args(argv))
+    serve(args['model'], host=args['host'], port=args['port'], quiet=args['quiet'], \
+        batch_size=args['batch_size'], batch_wait=args['batch_wait'], cache_size=args['cache_size'], \
+        metrics=args['metrics'])
+
+def batch_main(argv):
+    """Predicts every movie of a csv/jsonl file and streams the predictions as jsonl.
+    
+    Arguments:
+        argv {list[string]} -- command line arguments of the batch mode
+    """
+    from movieclassifier.serving.batch import read_records, predict_records, write_predictions
+    from movieclassifier.serving.cache import PredictionCache
+    from movieclassifier import instrumentation
+    args = vars(get_batch_arg_parser().parse_args(argv))
+    if args['metrics']:
+        instrumentation.enable()
+
+    file_format = args['format']
+    if file_format is None:
+        file_format = 'csv' if args['input'].endswith('.csv') else 'jsonl'
+
+    model = Model.load(args['model'])
+    cache = PredictionCache(model, max_size=args['cache_size']) if args['cache_size'] > 0 else None
+    infile = sys.stdin if args['input'] == '-' else open(args['input'], newline='')
+    outfile = sys.stdout if args['output'] == '-' else open(args['output'], 'w')
+    try:
+        records = read_records(infile, file_format)
+        predictions = predict_records(model, records, chunk_size=args['chunksize'], \
+            workers=args['workers'], cache=cache)
+        count, errors = write_predictions(predictions, outfile)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+    print('Predicted', count, 'movies', file=sys.stderr)
+    if errors:
+        print('Skipped', errors, 'records without a title or a description (see the "error" lines)', file=sys.stderr)
+    if cache is not None:
+        print('Cache:', json.dumps(cache.stats()), file=sys.stderr)
+    if args['metrics']:
+        with open(args['metrics'], 'w') as file:
+            json.dump(instrumentation.REGISTRY.snapshot(), file, indent=2)
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve_main(sys.argv[2:])
+        sys.exit()
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        batch_main(sys.argv[2:])
+        sys.exit()
+
     argparser = get_arg_parser()
     args = vars(argparser.parse_args())
 
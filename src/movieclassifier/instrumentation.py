@@ -0,0 +1,162 @@
+"""Lightweight instrumentation of the hot path. The duration of each stage (text
+processing steps, vectorization, scoring, model loading...) is recorded in a histogram,
+exportable in the Prometheus text format or as a JSON snapshot.
+
+The instrumentation is disabled by default: timer() then returns a shared no-op context
+manager and observe() returns immediately. Enable it with enable() or by setting the
+MOVIECLASSIFIER_METRICS environment variable.
+"""
+import os
+import time
+import threading
+
+# upper bounds of the histogram buckets (s), from 10us to 10s
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, \
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_NAME = 'movieclassifier_stage_seconds'
+
+_enabled = bool(os.environ.get('MOVIECLASSIFIER_METRICS'))
+
+class Histogram:
+    """Cumulative histogram of durations, with fixed buckets.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = 0
+        while i < len(self.buckets) and seconds > self.buckets[i]:
+            i += 1
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def cumulative_counts(self):
+        """Returns the number of observations lower or equal to each bucket bound.
+        
+        Returns:
+            list[tuple] -- (bound, count) for each bucket, the last bound is '+Inf'
+        """
+        total = 0
+        cumulative = []
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+class Registry:
+    """Collection of the histograms, one per stage.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def snapshot(self):
+        """Returns the current state of the histograms.
+        
+        Returns:
+            dict -- count, sum (s), mean (ms) and cumulative buckets of each stage
+        """
+        snapshot = {}
+        for name, histogram in sorted(self.histograms.items()):
+            snapshot[name] = {
+                'count': histogram.count,
+                'sum': histogram.sum,
+                'mean_ms': histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                'buckets': {str(bound): count for bound, count in histogram.cumulative_counts()},
+            }
+        return snapshot
+
+    def to_prometheus(self):
+        """Exports the histograms in the Prometheus text format.
+        
+        Returns:
+            string -- one histogram metric, with the stage as label
+        """
+        lines = ['# HELP ' + METRIC_NAME + ' Duration of each processing stage.', \
+            '# TYPE ' + METRIC_NAME + ' histogram']
+        for name, histogram in sorted(self.histograms.items()):
+            for bound, count in histogram.cumulative_counts():
+                lines.append('%s_bucket{stage="%s",le="%s"} %d' % (METRIC_NAME, name, bound, count))
+            lines.append('%s_sum{stage="%s"} %r' % (METRIC_NAME, name, histogram.sum))
+            lines.append('%s_count{stage="%s"} %d' % (METRIC_NAME, name, histogram.count))
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled
+
+def timer(name):
+    """Context manager recording the duration of its block in the histogram of a stage.
+    
+    Arguments:
+        name {string} -- name of the stage
+    
+    Returns:
+        context manager -- the timer, a no-op if the instrumentation is disabled
+    """
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(REGISTRY.histogram(name))
+
+def observe(name, seconds):
+    """Records a duration in the histogram of a stage, if the instrumentation is enabled.
+    
+    Arguments:
+        name {string} -- name of the stage
+        seconds {float} -- the duration
+    """
+    if _enabled:
+        REGISTRY.histogram(name).observe(seconds)
@@ -0,0 +1,12 @@
+from movieclassifier.model.OvRModel import OvRModel
+from movieclassifier.model.hashing import HashingTfidfVectorizer
+
+class HashingOvRModel(OvRModel):
+    """OvRModel with a hashing TF-IDF vectorizer instead of a vocabulary: the memory of the
+    vectorizer (idf vector) and of the weights only depends on n_features, whatever the
+    size of the corpus vocabulary. It can also be updated with partial_fit.
+    """
+
+    def __init__(self, base_sk_estimator, threshold=0.5, n_features=2**18, test_mode=False, n_jobs=None):
+        super().__init__(base_sk_estimator, threshold=threshold, test_mode=test_mode, n_jobs=n_jobs, \
+            vectorizer=HashingTfidfVectorizer(n_features=n_features))
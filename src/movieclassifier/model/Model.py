@@ -1,30 +1,17 @@
 from abc import ABC, abstractmethod
+import os
 import pickle
-import unicodedata
-import numpy as np
-import pandas as pd
-import sklearn.metrics as metrics
-from sklearn.preprocessing import MultiLabelBinarizer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from movieclassifier.preprocessing.text_preprocessing import process_text
+from movieclassifier.preprocessing.text_preprocessing import get_pipeline
+from movieclassifier.instrumentation import timer
 
-class Model(ABC):
+# pandas and sklearn are imported where they are used: a prediction with an array
+# artifact (see movieclassifier.model.artifact) needs neither of them
 
-    def __init__(self):
-        """Base constructor
-        """
-        self.binarizer = MultiLabelBinarizer()
-        self.vectorizer = TfidfVectorizer(max_df=0.8, max_features=100000)
-        self.clf = None
-
-    @abstractmethod
-    def fit(self, X, y):
-        """This method trains the model with the input data.
-        
-        Arguments:
-            X {pandas.Series} -- 1D array containing the text for each example
-            y {numpy.ndarray} -- 1D array with the labels for each example
-        """
+class InferenceModel(ABC):
+    """Interface of the models making predictions, trainable (see Model) or inference-only
+    (see movieclassifier.model.artifact.ArtifactModel). Subclasses set the binarizer and
+    the vectorizer, and implement predict.
+    """
 
     @abstractmethod
     def predict(self, X):
@@ -48,35 +35,38 @@ class Model(ABC):
             tuple -- assigned genre tags
         """
         observation = []
-        observation.append(process_text(title.lower() + description, show_times=verbose))
+        observation.append(self.prepare_text(title, description, verbose))
         pred = self.predict(observation)
-        tags = self.binarizer.inverse_transform(pred)
+        with timer('model.binarizer'):
+            tags = self.binarizer.inverse_transform(pred)
         return tags[0]
 
-    def save(self, file_path):
-        """Saves the model to the specified file path.
+    def predict_labels(self, texts):
+        """Predicts the genre tags of a list of processed texts with one call of the model.
         
         Arguments:
-            file_path {string} -- file path to save the model to
+            texts {list[string]} -- processed texts (see prepare_text)
+        
+        Returns:
+            list[tuple] -- assigned genre tags of each text
         """
-        file = open(file_path, 'wb')
-        pickle.dump(self, file)
-        file.close()
+        import pandas as pd
+        pred = self.predict(pd.Series(texts))
+        with timer('model.binarizer'):
+            return self.binarizer.inverse_transform(pred)
 
     @staticmethod
-    def load(file_path):
-        """Loads a model from file.
+    def prepare_text(title, description, verbose=False):
+        """Builds the processed text of a movie, as used to make a prediction.
         
         Arguments:
-            file_path {string} -- file path of the model to load
+            title {string} -- title of the movie
+            description {string} -- a short description of the movie
         
         Returns:
-            Model -- the loaded model
+            string -- the processed text
         """
-        file = open(file_path, 'rb')
-        model = pickle.load(file)
-        file.close()
-        return model
+        return get_pipeline().process(title.lower() + description, show_times=verbose)
 
     def get_stats(self, x_test, y_test):
         """Calculates the metrics of the model using the test set.
@@ -88,6 +78,8 @@ class Model(ABC):
         Returns:
             dict -- values for corresponding metrics
         """
+        import sklearn.metrics as metrics
+
         # binarize labels and get predictions
         y_test = self.binarizer.transform(y_test)
         ypred = self.predict(x_test)
@@ -99,4 +91,54 @@ class Model(ABC):
         perf_metrics['Recall'] = recall
         perf_metrics['F1 score'] = f1
         return perf_metrics
-        
\ No newline at end of file
+
+class Model(InferenceModel):
+
+    def __init__(self):
+        """Base constructor
+        """
+        from sklearn.preprocessing import MultiLabelBinarizer
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        self.binarizer = MultiLabelBinarizer()
+        self.vectorizer = TfidfVectorizer(max_df=0.8, max_features=100000)
+        self.clf = None
+
+    @abstractmethod
+    def fit(self, X, y):
+        """This method trains the model with the input data.
+        
+        Arguments:
+            X {pandas.Series} -- 1D array containing the text for each example
+            y {numpy.ndarray} -- 1D array with the labels for each example
+        """
+
+    def save(self, file_path):
+        """Saves the model to the specified file path.
+        
+        Arguments:
+            file_path {string} -- file path to save the model to
+        """
+        file = open(file_path, 'wb')
+        pickle.dump(self, file)
+        file.close()
+
+    @staticmethod
+    def load(file_path):
+        """Loads a model from file. A directory is loaded as an array artifact (see
+        movieclassifier.model.artifact), any other file as a pickled model.
+        
+        Arguments:
+            file_path {string} -- file path of the model to load
+        
+        Returns:
+            InferenceModel -- the loaded model (an ArtifactModel for a directory)
+        """
+        with timer('model.load'):
+            if os.path.isdir(file_path):
+                from movieclassifier.model.artifact import load_artifact
+                return load_artifact(file_path)
+
+            file = open(file_path, 'rb')
+            model = pickle.load(file)
+            file.close()
+            return model
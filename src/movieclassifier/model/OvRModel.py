@@ -1,40 +1,394 @@
 from movieclassifier.model.Model import Model
+from movieclassifier.model.linear import is_logistic, stack_coefficients, linear_scores, linear_threshold, sigmoid, \
+    quantize
+from movieclassifier.instrumentation import timer
 from sklearn.multiclass import OneVsRestClassifier
-from sklearn.base import BaseEstimator
+from sklearn.base import BaseEstimator, clone
+from sklearn.preprocessing import MultiLabelBinarizer, LabelBinarizer
 import numpy as np
 
 class OvRModel(Model):
 
-    def __init__(self, base_sk_estimator, threshold=0.5, test_mode=False):
+    def __init__(self, base_sk_estimator, threshold=0.5, test_mode=False, n_jobs=None, vectorizer=None):
+        """Constructor
+        
+        Arguments:
+            base_sk_estimator {BaseEstimator} -- binary estimator fitted for each genre
+        
+        Keyword Arguments:
+            threshold {float} -- probability threshold of the predictions (default: {0.5})
+            test_mode {bool} -- whether the data is already vectorized (default: {False})
+            n_jobs {int} -- number of processes fitting the genres in parallel, the feature
+                matrix is memory mapped by joblib and shared by the processes (default: {None})
+            vectorizer {object} -- vectorizer replacing the default TfidfVectorizer, i.e. a
+                HashingTfidfVectorizer to update the model with partial_fit (default: {None})
+        """
         super().__init__()
-        self.clf = OneVsRestClassifier(base_sk_estimator)
+        if vectorizer is not None:
+            self.vectorizer = vectorizer
+        self.clf = OneVsRestClassifier(base_sk_estimator, n_jobs=n_jobs)
         self.threshold = threshold
         self.support_proba = hasattr(base_sk_estimator.__class__, 'predict_proba')
         self.test_mode = test_mode
+        self.coef = None
+        self.intercept = None
+        self.coef_scale = None
     
-    def fit(self, X, y):
+    def fit(self, X, y, feature_cache=None):
+        """Trains the model with the input data.
+        
+        Arguments:
+            X {pandas.Series} -- 1D array containing the text for each example
+            y {numpy.ndarray} -- 1D array with the labels for each example
+        
+        Keyword Arguments:
+            feature_cache {FeatureCache} -- cache of the vectorized training sets, to skip the
+                vectorization of a training set seen before (default: {None})
+        """
         if not self.test_mode:
-            # transform target variables
-            y = self.binarizer.fit_transform(y)
-
-            # transform text to vector
-            X = self.vectorizer.fit_transform(X.values.astype('U'))
+            if feature_cache is not None:
+                X, y = feature_cache.fit_transform(self, X, y)
+            else:
+                X, y = self.fit_features(X, y)
         
         # train model
         self.clf.fit(X, y)
+        self._compile_if_linear()
+
+    def fit_features(self, X, y):
+        """Fits the vectorizer and the binarizer, and transforms the training set.
+        
+        Arguments:
+            X {pandas.Series} -- 1D array containing the text for each example
+            y {numpy.ndarray} -- 1D array with the labels for each example
+        
+        Returns:
+            tuple -- (feature matrix, binarized labels)
+        """
+        # transform target variables
+        y = self.binarizer.fit_transform(y)
+
+        # transform text to vector
+        X = self.vectorizer.fit_transform(X.values.astype('U'))
+
+        # the pruned terms are only kept for introspection, but take most of the pickle
+        if hasattr(self.vectorizer, 'stop_words_'):
+            self.vectorizer.stop_words_ = None
+        return X, y
+
+    def partial_fit(self, X, y):
+        """Updates the model with a new batch of examples, without retraining it on the
+        whole dataset. The genres not seen before get a new estimator. It requires a
+        vectorizer with partial_fit (HashingTfidfVectorizer) and a base estimator with
+        partial_fit (i.e. SGDClassifier).
+        
+        Arguments:
+            X {pandas.Series} -- 1D array containing the text for each example
+            y {numpy.ndarray} -- 1D array with the labels for each example
+        
+        Raises:
+            ValueError: if the vectorizer or the estimator can't be updated
+        """
+        if not hasattr(self.clf.estimator, 'partial_fit'):
+            raise ValueError("The base estimator doesn't support partial_fit:", type(self.clf.estimator).__name__)
 
-    def predict(self, X):
         if not self.test_mode:
-            # transform text to vector
-            if len(X) == 1:
-                X = self.vectorizer.transform(X)
-            else:
-                X = self.vectorizer.transform(X.values.astype('U'))
+            if not hasattr(self.vectorizer, 'partial_fit'):
+                raise ValueError("The vectorizer doesn't support partial_fit:", type(self.vectorizer).__name__)
+
+            # extend the genres with the new ones, keeping them sorted
+            known = list(getattr(self.binarizer, 'classes_', []))
+            labels = sorted(set(known).union(*[set(genres) for genres in y]))
+            if labels != known:
+                self._add_genres(known, labels)
+            y = self.binarizer.transform(y)
+
+            # update the document frequencies, then transform text to vector
+            texts = X.values.astype('U')
+            self.vectorizer.partial_fit(texts)
+            X = self.vectorizer.transform(texts)
+        elif not hasattr(self.clf, 'estimators_'):
+            self.clf.estimators_ = [clone(self.clf.estimator) for _ in range(y.shape[1])]
+
+        for i, estimator in enumerate(self.clf.estimators_):
+            if not hasattr(estimator, 'partial_fit'):
+                # a genre constant in the previous data has no estimator to update
+                estimator = self.clf.estimators_[i] = clone(self.clf.estimator)
+            estimator.partial_fit(X, y[:, i], classes=[0, 1])
+        self.clf.label_binarizer_ = LabelBinarizer(sparse_output=True).fit(y)
+        self._compile_if_linear()
+
+    def _add_genres(self, known, labels):
+        estimators = dict(zip(known, getattr(self.clf, 'estimators_', [])))
+        self.clf.estimators_ = [estimators[label] if label in estimators else clone(self.clf.estimator) \
+            for label in labels]
+        if isinstance(self.threshold, np.ndarray):
+            # the new genres get the mean of the tuned thresholds
+            thresholds = dict(zip(known, self.threshold))
+            default = self.threshold.mean() if len(self.threshold) else 0.5
+            self.threshold = np.array([thresholds.get(label, default) for label in labels])
+        self.binarizer = MultiLabelBinarizer(classes=labels)
+        self.binarizer.fit([])
+
+    def tune_thresholds(self, X, y, average='micro', candidates=None):
+        """Tunes one threshold per genre on a validation set, maximizing the micro or macro
+        F1 score. The probabilities are predicted only once, then the candidate thresholds
+        of each genre are evaluated together from the sorted probabilities. The macro F1 is
+        maximized genre by genre, the micro F1 by coordinate ascent starting from the best
+        common threshold. The genres without examples in the validation set keep their
+        current threshold. The thresholds are stored as a vector, so that predict costs the
+        same as with one threshold.
+        
+        Arguments:
+            X {pandas.Series} -- 1D array containing the text for each validation example
+            y {numpy.ndarray} -- 1D array with the labels for each validation example
+        
+        Keyword Arguments:
+            average {string} -- F1 score to maximize, 'micro' or 'macro' (default: {'micro'})
+            candidates {numpy.ndarray} -- candidate thresholds (default: {0.01, 0.02, ..., 0.99})
+        
+        Raises:
+            ValueError: if the estimators don't predict probabilities
+        
+        Returns:
+            float -- F1 score of the validation set with the tuned thresholds
+        """
+        if not self.support_proba:
+            raise ValueError("The base estimator doesn't predict probabilities:", type(self.clf.estimator).__name__)
+        if average not in ('micro', 'macro'):
+            raise ValueError("Unsupported average:", average)
+        if candidates is None:
+            candidates = np.round(np.arange(0.01, 1.0, 0.01), 2)
+
+        proba = self.predict_proba(X)
+        y = y if self.test_mode else self.binarizer.transform(y)
+        tp, predicted = _sweep_counts(proba, np.asarray(y), candidates)
+        positives = np.asarray(y).sum(axis=0)
+        n_genres = proba.shape[1]
+
+        thresholds = np.broadcast_to(np.asarray(self.threshold, dtype=np.float64), (n_genres,)).copy()
+        tuned = positives > 0
+        if average == 'macro':
+            f1 = _f1(tp, predicted, positives)
+            best = f1.argmax(axis=0)
+            thresholds[tuned] = candidates[best][tuned]
+        else:
+            # start from the best common threshold, then improve one genre at a time
+            best = np.full(n_genres, _f1(tp.sum(axis=1), predicted.sum(axis=1), positives.sum()).argmax())
+            genres = np.arange(n_genres)
+            improved = True
+            while improved:
+                improved = False
+                for g in np.flatnonzero(tuned):
+                    # totals of the other genres, plus each candidate of this genre
+                    other_tp = tp[best, genres].sum() - tp[best[g], g]
+                    other_predicted = predicted[best, genres].sum() - predicted[best[g], g]
+                    f1 = _f1(other_tp + tp[:, g], other_predicted + predicted[:, g], positives.sum())
+                    if f1.max() > f1[best[g]]:
+                        best[g] = f1.argmax()
+                        improved = True
+            thresholds[tuned] = candidates[best][tuned]
+
+        self.threshold = thresholds
+        y_pred = proba >= thresholds
+        tp, predicted = (y_pred & (np.asarray(y) == 1)).sum(axis=0), y_pred.sum(axis=0)
+        if average == 'macro':
+            return float(_f1(tp, predicted, positives).mean())
+        return float(_f1(tp.sum(), predicted.sum(), positives.sum()))
+
+    def _compile_if_linear(self):
+        # use the fused linear scoring whenever the estimators allow it
+        self.coef = None
+        self.intercept = None
+        self.coef_scale = None
+        if self.support_proba and not is_logistic(self.clf.estimator):
+            return
+        try:
+            self.compile()
+        except ValueError:
+            pass
+
+    def compile(self, dtype=np.float64):
+        """Stacks the fitted linear estimators in a single weight matrix and intercept
+        vector, so that predicting is a single sparse-dense product instead of a loop over
+        the estimators. Use dtype=np.float32 to halve the size of the fused weights, or
+        dtype=np.int8 to quantize them with one scale per genre (1/8 of the size). The
+        estimators keep their float64 coefficients (partial_fit, tune_thresholds and the
+        pickle use them), so the model itself grows: the smaller weights pay off in the
+        array artifact (see movieclassifier.model.artifact), which stores only them.
+        
+        Keyword Arguments:
+            dtype {numpy.dtype} -- type of the weights (default: {np.float64})
+        
+        Raises:
+            ValueError: if the estimators are not linear
+        """
+        coef, intercept = stack_coefficients(self.clf)
+        if np.dtype(dtype) == np.int8:
+            self.coef, self.coef_scale = quantize(coef)
+            self.intercept = intercept
+        else:
+            self.coef = coef.astype(dtype)
+            self.coef_scale = None
+            self.intercept = intercept.astype(dtype)
+
+    def compress(self, cutoff=1e-3, int8=False, X_test=None, y_test=None):
+        """Compresses a trained model: the terms whose absolute weight is below the cutoff
+        for every genre are removed from the vocabulary, the idf weights and the
+        coefficients of the estimators, and the weights are optionally quantized to int8
+        (see compile). The pruned terms are no longer part of the TF-IDF vectors, so the
+        norm of the vectors changes slightly: pass a test set to measure the F1 change.
+        
+        Keyword Arguments:
+            cutoff {float} -- weight below which a term is removed, None to keep every
+                term (default: {1e-3})
+            int8 {bool} -- whether to quantize the weights to int8 (default: {False})
+            X_test {pandas.Series} -- test texts, to compare the stats (default: {None})
+            y_test {numpy.ndarray} -- test labels (default: {None})
+        
+        Raises:
+            ValueError: if the estimators are not linear, or terms are pruned without a
+                vocabulary (hashed features)
+        
+        Returns:
+            dict -- number of terms, bytes of the weights (vocabulary, idf and coefficients)
+                and, with a test set, F1 score, each as a (before, after) tuple
+        """
+        coef, _ = stack_coefficients(self.clf)
+        stats_before = self.get_stats(X_test, y_test) if X_test is not None else None
+        size_before = self._weights_size()
+        n_terms = coef.shape[0]
+
+        if cutoff is not None:
+            if not hasattr(self.vectorizer, 'vocabulary_'):
+                raise ValueError("Terms can't be pruned without a vocabulary:", type(self.vectorizer).__name__)
+            keep = np.abs(coef).max(axis=1) >= cutoff
+            self._prune_terms(keep)
+
+        # the models pickled before the fused weights existed have no coef attribute
+        self.compile(dtype=np.int8 if int8 else getattr(getattr(self, 'coef', None), 'dtype', np.float64))
+
+        report = {
+            'terms': (n_terms, len(self.coef)),
+            'bytes': (size_before, self._weights_size()),
+        }
+        if stats_before is not None:
+            report['F1 score'] = (stats_before['F1 score'], self.get_stats(X_test, y_test)['F1 score'])
+        return report
+
+    def _prune_terms(self, keep):
+        # new contiguous indices of the kept terms
+        index = np.cumsum(keep) - 1
+        self.vectorizer.vocabulary_ = {term: int(index[i]) for term, i in self.vectorizer.vocabulary_.items() if keep[i]}
+        self.vectorizer.idf_ = self.vectorizer.idf_[keep]
+        # the inner TfidfTransformer checks the number of features
+        transformer = getattr(self.vectorizer, '_tfidf', None)
+        if hasattr(transformer, 'n_features_in_'):
+            transformer.n_features_in_ = int(keep.sum())
+        for estimator in self.clf.estimators_:
+            if hasattr(estimator, 'coef_'):
+                estimator.coef_ = np.ascontiguousarray(estimator.coef_[:, keep])
+                for name in ('_standard_coef', '_average_coef'):
+                    if getattr(estimator, name, None) is not None:
+                        setattr(estimator, name, np.ascontiguousarray(getattr(estimator, name)[..., keep]))
+            if hasattr(estimator, 'n_features_in_'):
+                estimator.n_features_in_ = int(keep.sum())
+        if hasattr(self.clf, 'n_features_in_'):
+            self.clf.n_features_in_ = int(keep.sum())
+
+    def _weights_size(self):
+        # bytes of the arrays growing with the number of terms
+        vocabulary = getattr(self.vectorizer, 'vocabulary_', {})
+        size = sum(len(term) for term in vocabulary) + getattr(self.vectorizer, 'idf_', np.empty(0)).nbytes
+        if getattr(self, 'coef', None) is not None:
+            size += self.coef.nbytes
+        else:
+            size += stack_coefficients(self.clf)[0].nbytes
+        return size
+
+    def __getstate__(self):
+        # the fused weights copy the coefficients of the estimators, so they are not
+        # pickled but compiled again when the model is loaded
+        state = self.__dict__.copy()
+        if state.get('coef') is not None:
+            state['coef_dtype'] = state['coef'].dtype.str
+            state['coef'] = None
+            state['intercept'] = None
+            state['coef_scale'] = None
+        return state
+
+    def __setstate__(self, state):
+        dtype = state.pop('coef_dtype', None)
+        self.__dict__.update(state)
+        if dtype is not None:
+            self.compile(dtype=np.dtype(dtype))
+
+    def _transform(self, X):
+        if self.test_mode:
+            return X
+        # transform text to vector
+        if len(X) == 1:
+            return self.vectorizer.transform(X)
+        return self.vectorizer.transform(X.values.astype('U'))
+
+    def predict_proba(self, X):
+        """Predicts the probability of each genre for every observation in X.
+        
+        Arguments:
+            X {pandas.Series} -- the data to predict
+        
+        Returns:
+            numpy.ndarray -- probabilities (n_samples, n_genres)
+        """
+        X = self._transform(X)
+        if getattr(self, 'coef', None) is not None:
+            return sigmoid(linear_scores(X, self.coef, self.intercept, getattr(self, 'coef_scale', None)))
+        return self.clf.predict_proba(X)
+
+    def predict(self, X):
+        with timer('model.vectorize'):
+            X = self._transform(X)
+
+        if getattr(self, 'coef', None) is not None:
+            with timer('model.score'):
+                scores = linear_scores(X, self.coef, self.intercept, getattr(self, 'coef_scale', None))
+            with timer('model.threshold'):
+                return linear_threshold(scores, self.threshold, self.support_proba)
 
         # Apply threshold to prediction if supported by the estimator
         if self.support_proba:
-            y_pred = self.clf.predict_proba(X)
-            y_pred = np.where(y_pred >= self.threshold, 1, 0)
+            with timer('model.score'):
+                y_pred = self.clf.predict_proba(X)
+            with timer('model.threshold'):
+                y_pred = np.where(y_pred >= self.threshold, 1, 0)
         else:
-            y_pred = self.clf.predict(X)
-        return y_pred
\ No newline at end of file
+            with timer('model.score'):
+                y_pred = self.clf.predict(X)
+        return y_pred
+
+def _sweep_counts(proba, y, candidates):
+    """Counts the true positives and the predicted positives of every genre for every
+    candidate threshold (a prediction is positive when the probability is >= threshold).
+    
+    Arguments:
+        proba {numpy.ndarray} -- probabilities (n_samples, n_genres)
+        y {numpy.ndarray} -- binarized labels (n_samples, n_genres)
+        candidates {numpy.ndarray} -- candidate thresholds (n_candidates)
+    
+    Returns:
+        tuple -- true positives and predicted positives, both (n_candidates, n_genres)
+    """
+    n_samples, n_genres = proba.shape
+    tp = np.empty((len(candidates), n_genres), dtype=np.int64)
+    predicted = np.empty((len(candidates), n_genres), dtype=np.int64)
+    for g in range(n_genres):
+        all_proba = np.sort(proba[:, g])
+        positive_proba = np.sort(proba[y[:, g] == 1, g])
+        predicted[:, g] = n_samples - np.searchsorted(all_proba, candidates, side='left')
+        tp[:, g] = len(positive_proba) - np.searchsorted(positive_proba, candidates, side='left')
+    return tp, predicted
+
+def _f1(tp, predicted, positives):
+    # 2 tp / (2 tp + fp + fn), where fp + fn = predicted + positives - 2 tp
+    denominator = np.asarray(predicted + positives, dtype=np.float64)
+    return np.divide(2 * tp, denominator, out=np.zeros_like(denominator), where=denominator > 0)
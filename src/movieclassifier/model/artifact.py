@@ -0,0 +1,256 @@
+import os
+import re
+import json
+import numpy as np
+import scipy.sparse as sp
+from movieclassifier.model.Model import InferenceModel
+from movieclassifier.model.linear import is_logistic, stack_coefficients, linear_scores, linear_threshold
+from movieclassifier.instrumentation import timer
+
+FORMAT_VERSION = 1
+HEADER_FILE = 'header.json'
+ARRAY_FILES = ['idf', 'coef', 'intercept']
+TFIDF = 'tfidf'
+HASHING = 'hashing'
+
+# TfidfVectorizer parameters reproduced by ArtifactVectorizer
+SUPPORTED_PARAMS = {'analyzer': 'word', 'binary': False, 'input': 'content', 'lowercase': True, \
+    'ngram_range': (1, 1), 'preprocessor': None, 'stop_words': None, 'strip_accents': None, \
+    'tokenizer': None, 'use_idf': True}
+
+class ArtifactVectorizer:
+    """Inference-only counterpart of a fitted TfidfVectorizer. The vocabulary is a sorted
+    string table searched with binary search instead of a dict, so that it can be memory
+    mapped from disk along with the idf weights.
+    """
+
+    def __init__(self, vocabulary, idf, token_pattern, norm='l2', sublinear_tf=False):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.token_pattern = token_pattern
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self._token_regex = re.compile(token_pattern)
+
+    def transform(self, texts):
+        """Transforms the texts to their TF-IDF representation, as TfidfVectorizer does.
+        
+        Arguments:
+            texts {iterable[string]} -- texts to transform
+        
+        Returns:
+            scipy.sparse.csr_matrix -- TF-IDF matrix (n_texts, n_features)
+        """
+        rows = []
+        tokens = []
+        n_texts = 0
+        for i, text in enumerate(texts):
+            doc_tokens = self._token_regex.findall(str(text).lower())
+            tokens.extend(doc_tokens)
+            rows.extend([i] * len(doc_tokens))
+            n_texts = i + 1
+
+        n_features = len(self.vocabulary)
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.zeros(0, dtype=np.int64)
+        if tokens:
+            tokens = np.array(tokens)
+            cols = np.searchsorted(self.vocabulary, tokens)
+            found = cols < n_features
+            found[found] = self.vocabulary[cols[found]] == tokens[found]
+            rows, cols = rows[found], cols[found]
+
+        X = sp.csr_matrix((np.ones(len(cols)), (rows, cols)), shape=(n_texts, n_features))
+        X.sum_duplicates()
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1
+        X.data *= self.idf[X.indices]
+        if self.norm:
+            _normalize_rows(X, self.norm)
+        return X
+
+def _normalize_rows(X, norm):
+    """Scales the rows of a csr matrix to unit norm in place, as sklearn's normalize.
+    
+    Arguments:
+        X {scipy.sparse.csr_matrix} -- the matrix to normalize
+        norm {string} -- 'l1' or 'l2'
+    """
+    row_lengths = np.diff(X.indptr)
+    rows = np.repeat(np.arange(X.shape[0]), row_lengths)
+    values = np.abs(X.data) if norm == 'l1' else X.data ** 2
+    norms = np.bincount(rows, weights=values, minlength=X.shape[0])
+    if norm == 'l2':
+        norms = np.sqrt(norms)
+    norms[norms == 0] = 1
+    X.data /= np.repeat(norms, row_lengths)
+
+class ArtifactBinarizer:
+    """Inference-only counterpart of a fitted MultiLabelBinarizer, converting between
+    the genres and the binary predictions.
+    """
+
+    def __init__(self, classes):
+        self.classes_ = np.array(classes, dtype=object)
+
+    def transform(self, y):
+        index = {label: i for i, label in enumerate(self.classes_)}
+        binary = np.zeros((len(y), len(self.classes_)), dtype=int)
+        for i, labels in enumerate(y):
+            binary[i, [index[label] for label in labels if label in index]] = 1
+        return binary
+
+    def inverse_transform(self, yt):
+        return [tuple(self.classes_.compress(indicators)) for indicators in np.asarray(yt)]
+
+class ArtifactModel(InferenceModel):
+    """Inference-only model loaded from the array artifact format (see save_artifact).
+    The prediction is a single sparse-dense product between the TF-IDF vectors and the
+    stacked per-genre weights. It can't be trained: train an OvRModel and convert it.
+    """
+
+    def __init__(self, vectorizer, coef, intercept, classes, threshold=0.5, support_proba=True, scale=None):
+        self.clf = None
+        self.binarizer = ArtifactBinarizer(classes)
+        self.vectorizer = vectorizer
+        self.coef = coef
+        self.intercept = intercept
+        self.coef_scale = scale
+        self.threshold = threshold
+        self.support_proba = support_proba
+
+    def predict(self, X):
+        with timer('model.vectorize'):
+            X = self.vectorizer.transform(X)
+        with timer('model.score'):
+            scores = linear_scores(X, self.coef, self.intercept, self.coef_scale)
+        with timer('model.threshold'):
+            return linear_threshold(scores, self.threshold, self.support_proba)
+
+def _tfidf_arrays(vectorizer, coef):
+    params = vectorizer.get_params()
+    for name, value in SUPPORTED_PARAMS.items():
+        if params[name] != value:
+            raise ValueError("Unsupported vectorizer parameter:", name, params[name])
+
+    # sort the vocabulary, so that terms can be found with binary search
+    terms = np.empty(len(vectorizer.vocabulary_), dtype=object)
+    for term, index in vectorizer.vocabulary_.items():
+        terms[index] = term
+    order = np.argsort(terms)
+    arrays = {
+        'vocabulary': terms[order].astype(str),
+        'idf': vectorizer.idf_[order],
+        'coef': np.ascontiguousarray(coef[order]),
+    }
+    settings = {
+        'vectorizer': TFIDF,
+        'token_pattern': params['token_pattern'],
+        'norm': params['norm'],
+        'sublinear_tf': params['sublinear_tf'],
+    }
+    return arrays, settings
+
+def _hashing_arrays(vectorizer, coef):
+    arrays = {
+        'idf': vectorizer.idf_,
+        'coef': coef,
+    }
+    settings = {
+        'vectorizer': HASHING,
+        'n_features': vectorizer.n_features,
+        'norm': vectorizer.norm,
+        'sublinear_tf': vectorizer.sublinear_tf,
+    }
+    return arrays, settings
+
+def save_artifact(model, dir_path):
+    """Saves a trained OvRModel with linear estimators in the array artifact format: a
+    directory with a small JSON header (genres, threshold, vectorizer settings) and one
+    .npy file for the idf weights, the coefficients, the intercepts and, unless the
+    vectorizer is a HashingTfidfVectorizer, the vocabulary. The fused weights of a
+    compiled model are saved with their type (see OvRModel.compile), the int8 ones with
+    their scales.
+    
+    Arguments:
+        model {OvRModel} -- the trained model
+        dir_path {string} -- directory to save the model to
+    
+    Raises:
+        ValueError: if the model can't be represented in this format
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from movieclassifier.model.hashing import HashingTfidfVectorizer
+    if model.support_proba and not is_logistic(model.clf.estimator):
+        raise ValueError("Unsupported estimator:", type(model.clf.estimator).__name__)
+    scale = getattr(model, 'coef_scale', None)
+    if getattr(model, 'coef', None) is not None:
+        coef, intercept = model.coef, model.intercept
+    else:
+        coef, intercept = stack_coefficients(model.clf)
+
+    if isinstance(model.vectorizer, TfidfVectorizer):
+        arrays, settings = _tfidf_arrays(model.vectorizer, coef)
+    elif isinstance(model.vectorizer, HashingTfidfVectorizer):
+        arrays, settings = _hashing_arrays(model.vectorizer, coef)
+    else:
+        raise ValueError("Unsupported vectorizer:", type(model.vectorizer).__name__)
+    arrays['intercept'] = intercept
+    if scale is not None:
+        arrays['scale'] = scale
+
+    header = {
+        'format_version': FORMAT_VERSION,
+        'classes': [str(c) for c in model.binarizer.classes_],
+        'threshold': np.asarray(model.threshold).tolist(),
+        'support_proba': model.support_proba,
+        'quantized': scale is not None,
+    }
+    header.update(settings)
+
+    os.makedirs(dir_path, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(dir_path, name + '.npy'), array)
+    with open(os.path.join(dir_path, HEADER_FILE), 'w') as file:
+        json.dump(header, file, indent=2)
+
+def load_artifact(dir_path, mmap=True):
+    """Loads a model saved in the array artifact format. The arrays are memory mapped by
+    default, so that processes loading the same model share the memory pages.
+    
+    Arguments:
+        dir_path {string} -- directory of the model to load
+    
+    Keyword Arguments:
+        mmap {bool} -- whether to memory map the arrays (default: {True})
+    
+    Returns:
+        ArtifactModel -- the loaded model
+    """
+    with open(os.path.join(dir_path, HEADER_FILE)) as file:
+        header = json.load(file)
+    if header['format_version'] != FORMAT_VERSION:
+        raise ValueError("Unsupported artifact version:", header['format_version'])
+
+    mmap_mode = 'r' if mmap else None
+    load = lambda name: np.load(os.path.join(dir_path, name + '.npy'), mmap_mode=mmap_mode)
+    arrays = {name: load(name) for name in ARRAY_FILES}
+
+    if header.get('vectorizer', TFIDF) == HASHING:
+        from movieclassifier.model.hashing import HashingTfidfVectorizer
+        vectorizer = HashingTfidfVectorizer(n_features=header['n_features'], norm=header['norm'], \
+            sublinear_tf=header['sublinear_tf'])
+        # inference only: the document frequencies are not saved
+        vectorizer.idf_ = arrays['idf']
+        vectorizer.doc_freq = None
+    else:
+        vectorizer = ArtifactVectorizer(load('vocabulary'), arrays['idf'], header['token_pattern'], \
+            norm=header['norm'], sublinear_tf=header['sublinear_tf'])
+    # a list of thresholds is a tuned threshold per genre
+    threshold = header['threshold']
+    if isinstance(threshold, list):
+        threshold = np.array(threshold)
+    scale = load('scale') if header.get('quantized') else None
+    return ArtifactModel(vectorizer, arrays['coef'], arrays['intercept'], header['classes'], \
+        threshold=threshold, support_proba=header['support_proba'], scale=scale)
@@ -0,0 +1,105 @@
+import os
+import pickle
+import hashlib
+import shutil
+import tempfile
+import numpy as np
+import scipy.sparse as sp
+
+VECTORIZER_FILE = 'vectorizer.pkl'
+FEATURES_FILE = 'features.npz'
+LABELS_FILE = 'labels.npy'
+
+class FeatureCache:
+    """Disk cache of the fitted vectorizer, the feature matrix and the binarized labels of
+    a training set. The entries are keyed on a hash of the texts, the labels and the
+    vectorizer parameters, so the experiments changing only the estimator or the threshold
+    skip the vectorization. The least recently used entries are removed when the cache
+    holds more than max_entries.
+    """
+
+    def __init__(self, dir_path, max_entries=4):
+        """Constructor
+        
+        Arguments:
+            dir_path {string} -- directory of the cache
+        
+        Keyword Arguments:
+            max_entries {int} -- maximum number of cached training sets (default: {4})
+        """
+        self.dir_path = dir_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(X, y, vectorizer):
+        """Returns the key of a training set vectorized by a vectorizer.
+        
+        Arguments:
+            X {pandas.Series} -- 1D array containing the text for each example
+            y {iterable} -- the labels for each example
+            vectorizer {object} -- the vectorizer, before fitting
+        
+        Returns:
+            string -- hexadecimal key
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(type(vectorizer).__name__.encode())
+        digest.update(repr(sorted(vectorizer.get_params().items())).encode())
+        for text in X:
+            digest.update(str(text).encode('utf-8') + b'\0')
+        for labels in y:
+            digest.update(','.join(labels).encode('utf-8') + b'\0')
+        return digest.hexdigest()
+
+    def fit_transform(self, model, X, y):
+        """Returns the feature matrix and the binarized labels of a training set, fitting
+        the vectorizer and the binarizer of the model. A cached training set is loaded
+        instead of being vectorized.
+        
+        Arguments:
+            model {OvRModel} -- the model being fitted
+            X {pandas.Series} -- 1D array containing the text for each example
+            y {iterable} -- the labels for each example
+        
+        Returns:
+            tuple -- (feature matrix, binarized labels)
+        """
+        entry_path = os.path.join(self.dir_path, self.key(X, y, model.vectorizer))
+        if os.path.isdir(entry_path):
+            self.hits += 1
+            # mark the entry as recently used
+            os.utime(entry_path)
+            with open(os.path.join(entry_path, VECTORIZER_FILE), 'rb') as file:
+                model.vectorizer, model.binarizer = pickle.load(file)
+            features = sp.load_npz(os.path.join(entry_path, FEATURES_FILE))
+            labels = np.load(os.path.join(entry_path, LABELS_FILE))
+            return features, labels
+
+        self.misses += 1
+        features, labels = model.fit_features(X, y)
+        self._save(entry_path, model, features, labels)
+        return features, labels
+
+    def _save(self, entry_path, model, features, labels):
+        os.makedirs(self.dir_path, exist_ok=True)
+        # written in a temporary directory and renamed, so a partial entry is never read
+        tmp_path = tempfile.mkdtemp(dir=self.dir_path)
+        with open(os.path.join(tmp_path, VECTORIZER_FILE), 'wb') as file:
+            pickle.dump((model.vectorizer, model.binarizer), file)
+        sp.save_npz(os.path.join(tmp_path, FEATURES_FILE), sp.csr_matrix(features))
+        np.save(os.path.join(tmp_path, LABELS_FILE), labels)
+        try:
+            os.rename(tmp_path, entry_path)
+        except OSError:
+            # another run saved the same entry meanwhile
+            shutil.rmtree(tmp_path)
+        self._evict()
+
+    def _evict(self):
+        entries = [os.path.join(self.dir_path, name) for name in os.listdir(self.dir_path)]
+        entries = [path for path in entries if os.path.isdir(path) and not os.path.basename(path).startswith('tmp')]
+        entries = sorted(entries, key=os.path.getmtime)
+        for entry_path in entries[:max(len(entries) - self.max_entries, 0)]:
+            shutil.rmtree(entry_path)
@@ -0,0 +1,80 @@
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+class HashingTfidfVectorizer:
+    """TF-IDF vectorizer without vocabulary: the terms are hashed to a fixed number of
+    features and the document frequencies are counted per feature. The statistics can
+    be updated with new documents (partial_fit), so the vectorizer never needs to be
+    refitted on the whole corpus, and its memory doesn't depend on the vocabulary size.
+    """
+
+    def __init__(self, n_features=2**18, norm='l2', smooth_idf=True, sublinear_tf=False):
+        """Constructor
+        
+        Keyword Arguments:
+            n_features {int} -- number of hashed features (default: {2**18})
+            norm {string} -- norm of the TF-IDF vectors, 'l1', 'l2' or None (default: {'l2'})
+            smooth_idf {bool} -- add one to the document frequencies, as TfidfVectorizer (default: {True})
+            sublinear_tf {bool} -- replace the term frequencies with 1 + log(tf) (default: {False})
+        """
+        self.n_features = n_features
+        self.norm = norm
+        self.smooth_idf = smooth_idf
+        self.sublinear_tf = sublinear_tf
+        self.hasher = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+        self.n_docs = 0
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+        self.idf_ = np.ones(n_features)
+
+    def get_params(self):
+        return {'n_features': self.n_features, 'norm': self.norm, 'smooth_idf': self.smooth_idf, \
+            'sublinear_tf': self.sublinear_tf}
+
+    def partial_fit(self, texts):
+        """Adds the document frequencies of the texts to the statistics.
+        
+        Arguments:
+            texts {iterable[string]} -- new documents
+        
+        Returns:
+            HashingTfidfVectorizer -- the vectorizer itself
+        """
+        counts = self.hasher.transform(texts)
+        self.n_docs += counts.shape[0]
+        self.doc_freq += np.bincount(counts.indices, minlength=self.n_features)
+        self._update_idf()
+        return self
+
+    def _update_idf(self):
+        smooth = int(self.smooth_idf)
+        # without smoothing, the features no document has hit yet count as seen once,
+        # instead of getting an infinite idf
+        doc_freq = np.maximum(self.doc_freq + smooth, 1)
+        self.idf_ = np.log((self.n_docs + smooth) / doc_freq) + 1
+
+    def fit(self, texts):
+        self.n_docs = 0
+        self.doc_freq = np.zeros(self.n_features, dtype=np.int64)
+        return self.partial_fit(texts)
+
+    def transform(self, texts):
+        """Transforms the texts to their TF-IDF representation.
+        
+        Arguments:
+            texts {iterable[string]} -- texts to transform
+        
+        Returns:
+            scipy.sparse.csr_matrix -- TF-IDF matrix (n_texts, n_features)
+        """
+        X = self.hasher.transform(texts).astype(np.float64)
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1
+        X.data *= self.idf_[X.indices]
+        if self.norm:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
+
+    def fit_transform(self, texts):
+        return self.fit(texts).transform(texts)
@@ -0,0 +1,126 @@
+from importlib.metadata import version
+import numpy as np
+import scipy.sparse as sp
+
+# name of the logistic loss of SGDClassifier, renamed in scikit-learn 1.1 (the version is
+# read from the package metadata, importing sklearn takes more than a second)
+SGD_LOG_LOSS = 'log' if tuple(int(v) for v in version('scikit-learn').split('.')[:2]) < (1, 1) else 'log_loss'
+
+def is_logistic(estimator):
+    """Whether the probabilities of a binary estimator are the sigmoid of its decision
+    function, so that they can be computed from the stacked coefficients.
+    
+    Arguments:
+        estimator {BaseEstimator} -- the estimator
+    
+    Returns:
+        bool -- True for logistic regression (also trained by SGD)
+    """
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    if isinstance(estimator, LogisticRegression):
+        return True
+    return isinstance(estimator, SGDClassifier) and estimator.loss in ('log', 'log_loss')
+
+def stack_coefficients(clf):
+    """Stacks the coefficients of the per-genre estimators of a fitted OneVsRestClassifier.
+    A genre that is constant in the training set is predicted by sklearn without an
+    estimator, so it gets null weights and an infinite intercept of the right sign.
+    
+    Arguments:
+        clf {OneVsRestClassifier} -- the fitted classifier
+    
+    Returns:
+        tuple -- weight matrix (n_features, n_genres) and intercept vector (n_genres)
+    
+    Raises:
+        ValueError: if an estimator is not linear
+    """
+    n_features = None
+    columns = []
+    intercepts = []
+    for estimator in clf.estimators_:
+        if hasattr(estimator, 'coef_'):
+            coef = estimator.coef_
+            coef = coef.toarray() if sp.issparse(coef) else np.asarray(coef)
+            columns.append(coef.ravel())
+            intercepts.append(float(np.ravel(estimator.intercept_)[0]))
+            n_features = coef.size
+        elif hasattr(estimator, 'y_'):
+            # sklearn's _ConstantPredictor
+            columns.append(None)
+            intercepts.append(np.inf if estimator.y_.ravel()[0] else -np.inf)
+        else:
+            raise ValueError("Not a linear estimator:", type(estimator).__name__)
+
+    if n_features is None:
+        raise ValueError("No linear estimator to stack")
+
+    coef = np.zeros((n_features, len(columns)))
+    for i, column in enumerate(columns):
+        if column is not None:
+            coef[:, i] = column
+    return coef, np.array(intercepts)
+
+def quantize(coef):
+    """Quantizes a weight matrix to int8, with one scale per genre (column), so that
+    coef ~ quantized * scale.
+    
+    Arguments:
+        coef {numpy.ndarray} -- weight matrix (n_features, n_genres)
+    
+    Returns:
+        tuple -- int8 weight matrix (n_features, n_genres) and scale vector (n_genres)
+    """
+    scale = np.abs(coef).max(axis=0) / 127 if len(coef) else np.ones(coef.shape[1])
+    # a genre without weights (constant in the training set) keeps a unit scale
+    scale[scale == 0] = 1
+    quantized = np.clip(np.round(coef / scale), -127, 127).astype(np.int8)
+    return quantized, scale
+
+def linear_scores(X, coef, intercept, scale=None):
+    """Computes the decision function of every genre with a single sparse-dense product.
+    
+    Arguments:
+        X {scipy.sparse.csr_matrix} -- feature matrix (n_samples, n_features)
+        coef {numpy.ndarray} -- weight matrix (n_features, n_genres)
+        intercept {numpy.ndarray} -- intercept vector (n_genres)
+    
+    Keyword Arguments:
+        scale {numpy.ndarray} -- per-genre scales of quantized weights (default: {None})
+    
+    Returns:
+        numpy.ndarray -- scores (n_samples, n_genres)
+    """
+    scores = np.asarray(X @ coef)
+    if scale is not None:
+        scores = scores * scale
+    return scores + intercept
+
+def sigmoid(scores):
+    """Logistic function of the scores, as scipy.special.expit, which is not imported at
+    inference time.
+    
+    Arguments:
+        scores {numpy.ndarray} -- scores (n_samples, n_genres)
+    
+    Returns:
+        numpy.ndarray -- probabilities (n_samples, n_genres)
+    """
+    with np.errstate(over='ignore'):
+        return 1 / (1 + np.exp(-scores))
+
+def linear_threshold(scores, threshold, support_proba):
+    """Turns the scores in binary predictions: the probabilities (sigmoid of the scores)
+    are compared with the threshold, otherwise the sign of the scores is used.
+    
+    Arguments:
+        scores {numpy.ndarray} -- scores (n_samples, n_genres)
+        threshold {float} -- probability threshold
+        support_proba {bool} -- whether the scores are logistic
+    
+    Returns:
+        numpy.ndarray -- binary predictions (n_samples, n_genres)
+    """
+    if support_proba:
+        return np.where(sigmoid(scores) >= threshold, 1, 0)
+    return np.where(scores > 0, 1, 0)
@@ -0,0 +1,206 @@
+import json
+import time
+import random
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import precision_recall_fscore_support
+from sklearn.model_selection import KFold, ParameterGrid
+from sklearn.preprocessing import MultiLabelBinarizer
+from sklearn.svm import LinearSVC
+from movieclassifier.model.OvRModel import OvRModel
+from movieclassifier.model.linear import SGD_LOG_LOSS
+
+# base estimators of the search, with the settings of training.py
+ESTIMATORS = {
+    'LogisticRegression': lambda: LogisticRegression(solver='saga', n_jobs=1, max_iter=1000),
+    'LinearSVC': lambda: LinearSVC(),
+    'SGDClassifier': lambda: SGDClassifier(loss=SGD_LOG_LOSS),
+}
+
+DEFAULT_SPACE = {
+    'vectorizer': {'max_df': [0.8], 'max_features': [50000, 100000]},
+    'estimators': {
+        'LogisticRegression': {'C': [0.5, 1.0, 2.0]},
+        'LinearSVC': {'C': [0.1, 1.0]},
+    },
+    'threshold': [0.2, 0.3, 0.4],
+}
+
+def load_search_space(file_path):
+    """Loads a search space from a JSON file, e.g.:
+    {"vectorizer": {"max_df": [0.8, 0.9]}, "estimators": {"LogisticRegression": {"C": [0.5, 1]},
+    "LinearSVC": {"C": [0.1]}}, "threshold": [0.2, 0.3]}
+    The vectorizer values are parameters of the TfidfVectorizer, the estimator values
+    parameters of the base estimator (see ESTIMATORS).
+    
+    Arguments:
+        file_path {string} -- path of the JSON file
+    
+    Returns:
+        dict -- the search space
+    """
+    with open(file_path) as file:
+        return json.load(file)
+
+def make_vectorizer(params):
+    """Builds the TF-IDF vectorizer of a configuration, with the defaults of Model
+    for the parameters the configuration leaves out.
+    
+    Arguments:
+        params {dict} -- parameters of the TfidfVectorizer
+    
+    Returns:
+        TfidfVectorizer -- the vectorizer
+    """
+    return TfidfVectorizer(max_df=0.8, max_features=100000).set_params(**params)
+
+def make_estimator(name, params, random_seed=42):
+    """Builds a base estimator of the search.
+    
+    Arguments:
+        name {string} -- name of the estimator (see ESTIMATORS)
+        params {dict} -- parameters of the estimator
+    
+    Keyword Arguments:
+        random_seed {int} -- random seed of the estimator (default: {42})
+    
+    Raises:
+        ValueError: if there is no such estimator
+    
+    Returns:
+        BaseEstimator -- the estimator
+    """
+    if name not in ESTIMATORS:
+        raise ValueError("No such estimator:", name)
+    estimator = ESTIMATORS[name]().set_params(**params)
+    if 'random_state' in estimator.get_params():
+        estimator.set_params(random_state=random_seed)
+    return estimator
+
+def search_candidates(space, n_iter=None, random_seed=42):
+    """Lists the configurations (vectorizer and estimator) of a search space: all of them
+    (grid search) or n_iter of them sampled without replacement (random search). The
+    thresholds are not part of the configurations, since they need no fitting.
+    
+    Arguments:
+        space {dict} -- the search space (see load_search_space)
+    
+    Keyword Arguments:
+        n_iter {int} -- number of sampled configurations, None for all (default: {None})
+        random_seed {int} -- seed of the sampling (default: {42})
+    
+    Returns:
+        list[tuple] -- (vectorizer params, estimator name, estimator params) of each configuration
+    """
+    grids = []
+    for name, params in space['estimators'].items():
+        grid = {'vectorizer__' + key: values for key, values in space.get('vectorizer', {}).items()}
+        grid.update({'estimator__' + key: values for key, values in params.items()})
+        grid['estimator'] = [name]
+        grids.append(grid)
+    candidates = list(ParameterGrid(grids))
+    if n_iter is not None and n_iter < len(candidates):
+        candidates = random.Random(random_seed).sample(candidates, n_iter)
+
+    configs = []
+    for candidate in candidates:
+        vectorizer_params = {key[12:]: value for key, value in candidate.items() if key.startswith('vectorizer__')}
+        estimator_params = {key[11:]: value for key, value in candidate.items() if key.startswith('estimator__')}
+        configs.append((vectorizer_params, candidate['estimator'], estimator_params))
+    return configs
+
+def _vectorize_fold(vectorizer, x_train, x_val):
+    vectorizer = clone(vectorizer)
+    return vectorizer.fit_transform(x_train), vectorizer.transform(x_val)
+
+def _fit_fold(estimator, X_train, y_train, X_val, y_val, thresholds):
+    model = OvRModel(estimator, test_mode=True)
+    start_time = time.time()
+    model.fit(X_train, y_train)
+    fit_time = time.time() - start_time
+
+    # the thresholds are evaluated on the same fitted model
+    scores = []
+    for threshold in thresholds if model.support_proba else [None]:
+        model.threshold = threshold
+        prec, recall, f1, _ = precision_recall_fscore_support(y_val, model.predict(X_val), \
+            average='micro', zero_division=0)
+        scores.append((threshold, prec, recall, f1))
+    return fit_time, scores
+
+def search(X, y, space, n_iter=None, n_splits=3, n_jobs=1, random_seed=42):
+    """Evaluates the configurations of a search space with a k-fold cross validation,
+    ranked by the mean micro F1 score of the validation folds. The folds of each distinct
+    vectorizer configuration are vectorized once and shared by all the estimators using
+    it; the folds and the estimator configurations are fitted in parallel by n_jobs
+    processes (the feature matrices are memory mapped by joblib, not copied).
+    
+    Arguments:
+        X {pandas.Series} -- 1D array containing the text for each example
+        y {iterable} -- the labels for each example
+        space {dict} -- the search space (see load_search_space)
+    
+    Keyword Arguments:
+        n_iter {int} -- number of sampled configurations, None for a grid search (default: {None})
+        n_splits {int} -- number of folds (default: {3})
+        n_jobs {int} -- number of processes (-1 for all cores) (default: {1})
+        random_seed {int} -- seed of the folds, the sampling and the estimators (default: {42})
+    
+    Returns:
+        list[dict] -- result of each configuration and threshold, best first: vectorizer,
+            estimator, params, threshold (None for the estimators without probabilities),
+            Precision, Recall, F1 score and Fit time (s), the mean fit time of a fold
+    """
+    texts = X.values.astype('U')
+    y = MultiLabelBinarizer().fit_transform(y)
+    folds = list(KFold(n_splits=n_splits, shuffle=True, random_state=random_seed).split(texts))
+    thresholds = space.get('threshold', [0.5])
+
+    # the configurations using the same vectorizer are grouped
+    configs = {}
+    for vectorizer_params, name, estimator_params in search_candidates(space, n_iter, random_seed):
+        key = json.dumps(vectorizer_params, sort_keys=True)
+        configs.setdefault(key, (vectorizer_params, []))[1].append((name, estimator_params))
+
+    results = []
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for vectorizer_params, estimators in configs.values():
+            vectorizer = make_vectorizer(vectorizer_params)
+            features = parallel(delayed(_vectorize_fold)(vectorizer, texts[train], texts[val]) \
+                for train, val in folds)
+
+            tasks = [(name, params, fold) for name, params in estimators for fold in range(n_splits)]
+            fitted = parallel(delayed(_fit_fold)(make_estimator(name, params, random_seed), \
+                features[fold][0], y[folds[fold][0]], features[fold][1], y[folds[fold][1]], thresholds) \
+                for name, params, fold in tasks)
+
+            for i, (name, params) in enumerate(estimators):
+                runs = fitted[i * n_splits:(i + 1) * n_splits]
+                fit_time = np.mean([fit_time for fit_time, _ in runs])
+                # mean of the folds for each threshold
+                for j, (threshold, _, _, _) in enumerate(runs[0][1]):
+                    prec, recall, f1 = np.mean([scores[j][1:] for _, scores in runs], axis=0)
+                    results.append({'vectorizer': vectorizer_params, 'estimator': name, 'params': params, \
+                        'threshold': threshold, 'Precision': prec, 'Recall': recall, 'F1 score': f1, \
+                        'Fit time (s)': fit_time})
+    return sorted(results, key=lambda result: -result['F1 score'])
+
+def build_model(result, n_jobs=None, random_seed=42):
+    """Builds the (unfitted) model of a search result.
+    
+    Arguments:
+        result {dict} -- a result of search
+    
+    Keyword Arguments:
+        n_jobs {int} -- number of processes fitting the genres in parallel (default: {None})
+        random_seed {int} -- random seed of the estimator (default: {42})
+    
+    Returns:
+        OvRModel -- the model
+    """
+    estimator = make_estimator(result['estimator'], result['params'], random_seed)
+    threshold = result['threshold'] if result['threshold'] is not None else 0.5
+    return OvRModel(estimator, threshold=threshold, n_jobs=n_jobs, vectorizer=make_vectorizer(result['vectorizer']))
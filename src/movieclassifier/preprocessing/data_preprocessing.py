@@ -1,3 +1,4 @@
+import os
 import re
 import json
 import unicodedata
@@ -6,8 +7,35 @@ import inflect
 import numpy as np
 import pandas as pd
 
+CSV = 'csv'
+COLUMNAR = 'columnar'
+COLUMNAR_VERSION = 1
+HEADER_FILE = 'header.json'
+TEXT_COLUMNS = ['title', 'overview']
+TEXT_END = '\0'
+# columns of a raw row which identify its content
+SOURCE_COLUMNS = ['id', 'release_date', 'title', 'overview', 'genres']
+
+def data_format(file_path):
+    """Returns the format of a data file path: a directory is a columnar store (see
+    save_data) and a file is csv (read by pandas, i.e. compressed or without extension).
+    A path not created yet is a columnar store, unless it has an extension (e.g. .csv).
+    
+    Arguments:
+        file_path {string} -- data file path
+    
+    Returns:
+        string -- CSV or COLUMNAR
+    """
+    if os.path.isdir(file_path):
+        return COLUMNAR
+    if os.path.exists(file_path) or os.path.splitext(file_path)[1]:
+        return CSV
+    return COLUMNAR
+
 def load_data(file_path):
     """Loads the data from the file path as a pandas dataframe without further processing.
+    A columnar store is loaded with the genres of each row as a tuple.
     
     Arguments:
         file_path {string} -- data file path
@@ -15,16 +43,133 @@ def load_data(file_path):
     Returns:
         pandas.DataFrame -- loaded data as dataframe
     """
+    if data_format(file_path) == COLUMNAR:
+        return _load_columnar(file_path)
     return pd.read_csv(file_path)
 
-def save_data(df, file_path):
-    """Saves the dataframe as a csv file for later use.
+def load_data_chunks(file_path, chunk_size):
+    """Loads the data from the file path as an iterator of dataframes, each one with at
+    most chunk_size rows, so that only one chunk at a time is kept in memory. The values
+    are read as strings: the types inferred for each chunk may differ (e.g. a column with
+    a missing value becomes float), which would change the hashes of the duplicate rows.
     
     Arguments:
-        df {pandas.DataFrame} -- dataframe to save to file
-        file_path {str} -- default path (default: {'./data/movies_data_ready.csv'})
+        file_path {string} -- data file path
+        chunk_size {int} -- number of rows per chunk
+    
+    Returns:
+        iterator[pandas.DataFrame] -- loaded data as chunks of dataframes
     """
-    df.to_csv(file_path, index=False)
+    return pd.read_csv(file_path, chunksize=chunk_size, dtype=str)
+
+def save_data(df, file_path, append=False):
+    """Saves the processed dataframe for later use, in the format of data_format. A path
+    with an extension (e.g. .csv) or an existing file is saved as csv, with the genres
+    joined by commas. Any other path is saved as a columnar store: a directory with the
+    texts of each column in one utf-8 file, and the genres dictionary-encoded (one code
+    per row, referring to a set of genres), so that loading it requires no parsing.
+    
+    Arguments:
+        df {pandas.DataFrame} -- dataframe to save to file (title, overview, genres)
+        file_path {str} -- default path (default: {'./data/movies_data_ready'})
+    
+    Keyword Arguments:
+        append {bool} -- append the rows to an existing file, without header (default: {False})
+    """
+    if data_format(file_path) == COLUMNAR:
+        _save_columnar(df, file_path, append)
+        return
+
+    df = df.copy()
+    if len(df) and not isinstance(df['genres'].iloc[0], str):
+        df['genres'] = df['genres'].apply(','.join)
+    if append:
+        df.to_csv(file_path, index=False, mode='a', header=False)
+    else:
+        df.to_csv(file_path, index=False)
+
+def load_texts(file_path, column):
+    """Loads one text column of the processed data, as it was saved (an empty text is
+    loaded as an empty string, not as NaN).
+    
+    Arguments:
+        file_path {string} -- data file path
+        column {string} -- name of the text column
+    
+    Returns:
+        list[string] -- the texts of the column
+    """
+    if data_format(file_path) == COLUMNAR:
+        with open(os.path.join(file_path, column + '.txt'), encoding='utf-8', newline='') as file:
+            return file.read().split(TEXT_END)[:-1]
+    return pd.read_csv(file_path, usecols=[column], dtype=str, keep_default_na=False)[column].tolist()
+
+def row_hashes(df):
+    """Hashes the content of each raw row (id, release date, title, overview and genres,
+    when present), so that the rows inserted or modified since a previous run can be found.
+    
+    Arguments:
+        df {pandas.DataFrame} -- the raw dataframe
+    
+    Returns:
+        pandas.Series -- uint64 hash of each row, with the index of df
+    """
+    columns = [column for column in SOURCE_COLUMNS if column in df.columns]
+    return pd.util.hash_pandas_object(df[columns], index=False)
+
+def _read_header(dir_path):
+    with open(os.path.join(dir_path, HEADER_FILE)) as file:
+        return json.load(file)
+
+def _save_columnar(df, dir_path, append):
+    if append:
+        header = _read_header(dir_path)
+    else:
+        os.makedirs(dir_path, exist_ok=True)
+        header = {'format_version': COLUMNAR_VERSION, 'n_rows': 0, 'columns': TEXT_COLUMNS, 'genre_sets': []}
+    mode = 'a' if append else 'w'
+
+    # the texts are terminated by NUL, which is never part of a text
+    for column in TEXT_COLUMNS:
+        texts = df[column].astype(str).str.replace(TEXT_END, '', regex=False)
+        with open(os.path.join(dir_path, column + '.txt'), mode, encoding='utf-8', newline='') as file:
+            file.write(''.join(text + TEXT_END for text in texts))
+
+    # each distinct set of genres is stored once in the header, and each row holds its code
+    genres = df['genres']
+    if len(genres) and isinstance(genres.iloc[0], str):
+        genres = genres.str.split(',')
+    set_codes = {tuple(labels): i for i, labels in enumerate(header['genre_sets'])}
+    codes = []
+    for labels in genres:
+        labels = tuple(labels)
+        if labels not in set_codes:
+            set_codes[labels] = len(header['genre_sets'])
+            header['genre_sets'].append(list(labels))
+        codes.append(set_codes[labels])
+    with open(os.path.join(dir_path, 'genres.codes'), mode + 'b') as file:
+        np.array(codes, dtype=np.int32).tofile(file)
+
+    header['n_rows'] += len(df)
+    with open(os.path.join(dir_path, HEADER_FILE), 'w') as file:
+        json.dump(header, file, indent=2)
+
+def _load_columnar(dir_path):
+    header = _read_header(dir_path)
+    if header['format_version'] != COLUMNAR_VERSION:
+        raise ValueError('Unsupported data format version: ' + str(header['format_version']))
+
+    data = {}
+    for column in header['columns']:
+        data[column] = load_texts(dir_path, column)
+
+    # the rows with the same genres share the same (immutable) tuple
+    genre_sets = np.empty(len(header['genre_sets']), dtype=object)
+    genre_sets[:] = [tuple(labels) for labels in header['genre_sets']]
+    codes_path = os.path.join(dir_path, 'genres.codes')
+    codes = np.memmap(codes_path, dtype=np.int32, mode='r') if header['n_rows'] else np.empty(0, dtype=np.int32)
+    data['genres'] = genre_sets[codes]
+    return pd.DataFrame(data, columns=header['columns'] + ['genres'])
 
 def extract_genres(genres_str):
     """Extracts the genres in string form as a list of genres
@@ -42,43 +187,75 @@ def extract_genres(genres_str):
         genres_list.append(elem['name'])
     return genres_list
 
-def process_data(df):
+def _seen_rows_mask(df, seen_rows):
+    """Flags the rows whose hash is in seen_rows (or is repeated in df) and records the
+    hashes of the others.
+    
+    Arguments:
+        df {pandas.DataFrame} -- the dataframe to deduplicate
+        seen_rows {set} -- hashes of the rows seen so far, updated in place
+    
+    Returns:
+        numpy.ndarray -- boolean mask of the duplicate rows
+    """
+    row_hashes = pd.util.hash_pandas_object(df, index=False)
+    is_duplicate = []
+    for row_hash in row_hashes:
+        is_duplicate.append(row_hash in seen_rows)
+        seen_rows.add(row_hash)
+    return np.array(is_duplicate, dtype=bool)
+
+def parse_genres(genres):
+    """Extracts the genres of every row of a column, parsing each distinct genres string
+    only once (see extract_genres).
+    
+    Arguments:
+        genres {pandas.Series} -- strings containing the genres
+    
+    Returns:
+        list[list] -- the extracted genres of each row
+    """
+    parsed = {genres_str: extract_genres(genres_str) for genres_str in genres.unique()}
+    return [list(parsed[genres_str]) for genres_str in genres]
+
+def process_data(df, seen_rows=None):
     """Transformes the format of the raw dataframe and handles the missing values.
+    The rows are dropped with one combined mask of the cleaning rules.
     
     Arguments:
         df {pandas.DataFrame} -- the raw input dataframe
     
+    Keyword Arguments:
+        seen_rows {set} -- hashes of the rows of the previous chunks, used to remove 
+            duplicates across chunks when the data is streamed (default: {None})
+    
     Returns:
         pandas.DataFrame -- transformed dataframe, ready for text preprocessing
     """
-    df = pd.concat([df['release_date'], df['title'], df['overview'], df['genres']], axis=1)
+    df = df[['release_date', 'title', 'overview', 'genres']]
 
-    # Drop the NaN rows where either title or overview is NaN
     # remove duplicates
-    duplicate_rows = df[df.duplicated()]
-    df.drop(duplicate_rows.index, inplace=True)
-
-    # convert empty string to NaN
-    df['overview'].replace('', np.nan, inplace=True)
-    df.dropna(subset=['release_date', 'title', 'overview'], inplace=True)
+    if seen_rows is None:
+        drop = df.duplicated().to_numpy(dtype=bool, copy=True)
+    else:
+        drop = _seen_rows_mask(df, seen_rows)
 
-    # the release date is no longer necessary, because NaN are cleared
-    del df['release_date']
+    # Drop the rows where either release date, title or overview is NaN or empty
+    overview = df['overview']
+    drop |= df[['release_date', 'title', 'overview']].isna().any(axis=1).values
+    drop |= (overview == '').values
 
     # Drop rows with no overview info or blank
     reg_404 = "^not available|^no overview"
-    overview_not_found = df['overview'].str.contains(reg_404, regex=True, flags=re.IGNORECASE)
-    df.drop(df[overview_not_found].index, inplace=True)
-
-    overview_blank = df['overview'].str.isspace()
-    df.drop(df[overview_blank].index, inplace=True)
+    drop |= overview.str.contains(reg_404, regex=True, flags=re.IGNORECASE, na=False).values.astype(bool)
+    drop |= overview.str.isspace().fillna(False).values.astype(bool)
 
-    # Transform column genre
     # remove rows with no genres, since they don't provide any information
-    df.drop(df[df['genres'] == '[]'].index, inplace=True)
+    drop |= (df['genres'] == '[]').values
+
+    # the release date is no longer necessary, because NaN are cleared
+    df = df.loc[~drop, ['title', 'overview', 'genres']].copy()
 
     # transform genres from string to list
-    temp_genre = df['genres'].apply(extract_genres)
-    df['genres'] = temp_genre
-    
-    return df
\ No newline at end of file
+    df['genres'] = parse_genres(df['genres'])
+    return df
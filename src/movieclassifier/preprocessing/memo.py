@@ -0,0 +1,135 @@
+import pickle
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+class MemoTable:
+    """Bounded memo table of the results of a function, with least recently used eviction
+    and hit/miss counters. The entries and counts added by the lookups since the last call
+    of pop_updates can be collected, to merge the tables filled by worker processes; the
+    counts merged with update are not collected again.
+    """
+
+    def __init__(self, max_size=100000):
+        """Constructor
+        
+        Keyword Arguments:
+            max_size {int} -- maximum number of entries (default: {100000})
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._updates = {}
+        self._new_hits = 0
+        self._new_misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, compute):
+        """Returns the memoized value of a key, computing it on the first request.
+        
+        Arguments:
+            key {hashable} -- the key
+            compute {callable} -- function without arguments computing the value
+        
+        Returns:
+            object -- the value of the key
+        """
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._new_hits += 1
+                return value
+            self.misses += 1
+            self._new_misses += 1
+
+        value = compute()
+        with self._lock:
+            self._store(key, value)
+            self._updates[key] = value
+            if len(self._updates) > self.max_size:
+                del self._updates[next(iter(self._updates))]
+        return value
+
+    def _store(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def update(self, entries, hits=0, misses=0):
+        """Adds the entries of another table (i.e. the updates of a worker process).
+        
+        Arguments:
+            entries {dict} -- the entries to add
+        
+        Keyword Arguments:
+            hits {int} -- hits to add to the counter (default: {0})
+            misses {int} -- misses to add to the counter (default: {0})
+        """
+        with self._lock:
+            for key, value in entries.items():
+                self._store(key, value)
+            self.hits += hits
+            self.misses += misses
+
+    def pop_updates(self):
+        """Returns the entries and counts added by the lookups since the last call, and
+        forgets them.
+        
+        Returns:
+            dict -- the new entries ('entries'), hits ('hits') and misses ('misses')
+        """
+        with self._lock:
+            updates = {'entries': self._updates, 'hits': self._new_hits, 'misses': self._new_misses}
+            self._updates = {}
+            self._new_hits = 0
+            self._new_misses = 0
+        return updates
+
+    def items(self):
+        with self._lock:
+            return list(self._entries.items())
+
+    def stats(self):
+        """Returns the counters of the table.
+        
+        Returns:
+            dict -- size, hits, misses and hit rate of the table
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+def save_memo(tables, file_path):
+    """Saves the entries of the memo tables to file.
+    
+    Arguments:
+        tables {dict} -- memo tables by name
+        file_path {string} -- file path to save the tables to
+    """
+    with open(file_path, 'wb') as file:
+        pickle.dump({name: table.items() for name, table in tables.items()}, file)
+
+def load_memo(tables, file_path):
+    """Loads the entries saved with save_memo in the memo tables with the same names.
+    
+    Arguments:
+        tables {dict} -- memo tables by name
+        file_path {string} -- file path of the saved tables
+    """
+    with open(file_path, 'rb') as file:
+        saved = pickle.load(file)
+    for name, entries in saved.items():
+        if name in tables:
+            tables[name].update(dict(entries))
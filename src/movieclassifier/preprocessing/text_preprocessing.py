@@ -1,22 +1,263 @@
 import re
 import json
 import unicodedata
-import nltk
-from nltk.corpus import wordnet
-from nltk.corpus import stopwords
-import inflect
-import pandas as pd
 import time
+from movieclassifier import instrumentation
+from movieclassifier.preprocessing.memo import MemoTable, save_memo, load_memo
+from movieclassifier.preprocessing.stopwords import ENGLISH_STOPWORDS
+
+# nltk, inflect and pandas take seconds to import, so they are imported on first use:
+# predicting a text without numbers doesn't need inflect, nor pandas
+
+SPECIALS_REGEX = re.compile(r'[^\w\s]')
+# WordNet part of speech tags (as nltk.corpus.reader.wordnet)
+ADJ, NOUN, VERB, ADV = 'a', 'n', 'v', 'r'
+WORDNET_TAGS = {"J": ADJ, "N": NOUN, "V": VERB, "R": ADV}
+# fast check for the rows that may have one of the contractions (lowercase text)
+ANY_CONTRACTION_REGEX = re.compile(r"cannot|gimme|gonna|gotta|lemme|wanna|'", re.IGNORECASE)
+# contractions split by nltk.word_tokenize (i.e. 'cannot' -> 'can not'), as in
+# nltk.tokenize.treebank.MacIntyreContractions (CONTRACTIONS2 + CONTRACTIONS3)
+CONTRACTIONS_REGEX = [re.compile(pattern) for pattern in [
+    r"(?i)\b(can)(?#X)(not)\b", r"(?i)\b(d)(?#X)('ye)\b", r"(?i)\b(gim)(?#X)(me)\b",
+    r"(?i)\b(gon)(?#X)(na)\b", r"(?i)\b(got)(?#X)(ta)\b", r"(?i)\b(lem)(?#X)(me)\b",
+    r"(?i)\b(more)(?#X)('n)\b", r"(?i)\b(wan)(?#X)(na)(?=\s)",
+    r"(?i) ('t)(?#X)(is)\b", r"(?i) ('t)(?#X)(was)\b"]]
+REGEX = 'regex'
+NLTK = 'nltk'
+STEP_METRICS = ['text.lowercase', 'text.ascii', 'text.specials', 'text.tokenization', \
+    'text.stopwords', 'text.num2words', 'text.lemmatisation']
+
+class TextPipeline:
+    """Reusable text processing pipeline. The expensive resources (inflect engine,
+    lemmatiser) are loaded only once and shared by every call. The conversions of
+    the numbers to words and the lemmas are memoized in bounded tables, which can be
+    saved and loaded to warm-start the next runs.
+    """
+
+    steps = ['1. to lowercase', '2. to ACII and utf8', '3. remove special chars', \
+        '4. tokenization', '5. stop words', '6. num2words', '7. lemmatisation']
+
+    def __init__(self, memo_size=100000, tokenizer=REGEX):
+        """Constructor
+        
+        Keyword Arguments:
+            memo_size {int} -- maximum size of each memo table (default: {100000})
+            tokenizer {string} -- tokenizer of step 4, REGEX (regex_tokenize) or NLTK
+                (nltk.word_tokenize), which give the same tokens (default: {REGEX})
+        """
+        if tokenizer not in TOKENIZERS:
+            raise ValueError("No such tokenizer:", tokenizer)
+        self.tokenizer = tokenizer
+        self._engine = None
+        self._lemmatiser = None
+        self.number_words = MemoTable(max_size=memo_size)
+        self.lemmas = MemoTable(max_size=memo_size)
+
+    @property
+    def memo_tables(self):
+        return {'number_words': self.number_words, 'lemmas': self.lemmas}
+
+    def save_memo(self, file_path):
+        """Saves the memo tables (number words and lemmas) to file.
+        
+        Arguments:
+            file_path {string} -- file path to save the tables to
+        """
+        save_memo(self.memo_tables, file_path)
+
+    def load_memo(self, file_path):
+        """Loads the memo tables saved by save_memo.
+        
+        Arguments:
+            file_path {string} -- file path of the saved tables
+        """
+        load_memo(self.memo_tables, file_path)
+
+    def pop_memo_updates(self):
+        return {name: table.pop_updates() for name, table in self.memo_tables.items()}
+
+    def update_memo(self, updates):
+        for name, entries in updates.items():
+            self.memo_tables[name].update(**entries)
+
+    @property
+    def stopwords(self):
+        # a set for O(1) lookups, which doesn't import nltk (see stopwords.py)
+        return ENGLISH_STOPWORDS
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            import inflect
+            self._engine = inflect.engine()
+        return self._engine
+
+    @property
+    def lemmatiser(self):
+        if self._lemmatiser is None:
+            import nltk
+            self._lemmatiser = nltk.WordNetLemmatizer()
+        return self._lemmatiser
+
+    def process(self, text, lemmatise=False, show_times=False):
+        """Applies text processing techniques to the raw input text, which includes: 
+            - convert to lower case;
+            - replace non-unicode characters with valid counterparts
+            - remove special characters 
+            - tokenization of the text
+            - stopwords removal
+            - conversion of numbers to textual representation
+            - lemmatisation
+        
+        Arguments:
+            text {string} -- raw text as string
+            lemmatise {bool} -- whether to lemmatise text
+            show_times {bool} -- whether to show processing times
+        
+        Returns:
+            string -- the transformed text
+        """
+        if show_times or instrumentation.is_enabled():
+            return self._process_timed(text, lemmatise, show_times)
+
+        for step in self._step_functions(lemmatise):
+            text = step(text)
+        return ' '.join(text)
+
+    def _step_functions(self, lemmatise):
+        steps = [
+            to_lower,                   # 1. Transform all characters in lowercase
+            to_ascii,                   # 2. Replace all compatibility characters with their equivalents (i.e. accented)
+            remove_specials,            # 3. Remove special characters (punctuation, extra spaces)
+            TOKENIZERS[self.tokenizer], # 4. Tokenization
+            self.remove_stopwords,      # 5. Stopwords removal
+            self.replace_nums2words,    # 6. Convert to number to text representation
+        ]
+        if lemmatise:
+            steps.append(self.lemmatisation)    # 7. Lemmatisation
+        return steps
+
+    def _process_timed(self, text, lemmatise, show_times):
+        # same as process, recording the duration of each step
+        durations = []
+        for metric, step in zip(STEP_METRICS, self._step_functions(lemmatise)):
+            start_time = time.perf_counter()
+            text = step(text)
+            durations.append(time.perf_counter() - start_time)
+            instrumentation.observe(metric, durations[-1])
+
+        if show_times:
+            _print_times(self.steps[:len(durations)], durations)
+        return ' '.join(text)
+
+    def process_many(self, texts, lemmatise=False):
+        """Applies the text processing to every text of an iterable.
+        
+        Arguments:
+            texts {iterable[string]} -- raw texts
+            lemmatise {bool} -- whether to lemmatise text
+        
+        Returns:
+            list[string] -- the transformed texts, in the same order
+        """
+        return [self.process(text, lemmatise=lemmatise) for text in texts]
+
+    def process_series(self, texts, lemmatise=False):
+        """Applies the text processing to a whole column at once. The output is the same
+        of process, but the steps run as vectorized pandas string operations and the
+        number conversion is done once per distinct number.
+        
+        Arguments:
+            texts {pandas.Series} -- raw texts
+            lemmatise {bool} -- whether to lemmatise text
+        
+        Returns:
+            pandas.Series -- the transformed texts, with the same index
+        """
+        # 1-3. lowercase, ASCII folding and special characters removal
+        texts = texts.str.lower().str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('utf8')
+        texts = texts.str.replace('-', ' ', regex=False).str.replace(SPECIALS_REGEX, '', regex=True)
+
+        # 4. Tokenization: no punctuation is left, so the text is only split at the
+        # whitespaces and the contractions (only searched in the rows having one), as
+        # regex_tokenize does
+        if self.tokenizer == NLTK:
+            tokens = texts.map(word_tokenize)
+        else:
+            texts = ' ' + texts + ' '
+            has_contraction = texts.str.contains(ANY_CONTRACTION_REGEX, regex=True)
+            if has_contraction.any():
+                contracted = texts[has_contraction]
+                for regex in CONTRACTIONS_REGEX:
+                    contracted = contracted.str.replace(regex, r' \1 \2 ', regex=True)
+                texts = texts.where(~has_contraction, contracted)
+            tokens = texts.str.split()
+
+        # 5-6. Stopwords removal and conversion of the numbers to text, once for each
+        # distinct number
+        stop = self.stopwords
+        numbers = {word for words in tokens for word in words if word.isdigit()}
+        number_words = {number: self.number_to_words(number) for number in numbers}
+        tokens = [[number_words.get(word, word) for word in words if word not in stop] for words in tokens]
+
+        # 7. Lemmatisation
+        if lemmatise:
+            tokens = [self.lemmatisation(words) for words in tokens]
+        import pandas as pd
+        return pd.Series([' '.join(words) for words in tokens], index=texts.index, dtype=object)
+
+    def remove_stopwords(self, tokens):
+        return [word for word in tokens if word not in self.stopwords]
+
+    def replace_nums2words(self, tokens):
+        words = []
+        for word in tokens:
+            if word.isdigit():
+                words.append(self.number_to_words(word))
+            else:
+                words.append(word)
+        return words
+
+    def number_to_words(self, number):
+        return self.number_words.get(number, lambda: self.engine.number_to_words(number).replace(',', ''))
+
+    def lemmatisation(self, tokens):
+        import nltk
+        words = []
+        for word, tag in nltk.pos_tag(tokens):
+            proper_tag = WORDNET_TAGS.get(tag[0].upper(), NOUN)
+            words.append(self.lemmas.get((word, proper_tag), lambda: self.lemmatiser.lemmatize(word, proper_tag)))
+        return words
+
+_shared_pipeline = None
+
+def get_pipeline():
+    """Returns the pipeline shared by the whole process, creating it on first use.
+    
+    Returns:
+        TextPipeline -- the shared pipeline
+    """
+    global _shared_pipeline
+    if _shared_pipeline is None:
+        _shared_pipeline = TextPipeline()
+    return _shared_pipeline
+
+def process_series(texts, lemmatise=False):
+    """Applies text processing techniques to a column of raw texts using the shared
+    pipeline (see TextPipeline.process_series).
+    
+    Arguments:
+        texts {pandas.Series} -- raw texts
+        lemmatise {bool} -- whether to lemmatise text
+    
+    Returns:
+        pandas.Series -- the transformed texts
+    """
+    return get_pipeline().process_series(texts, lemmatise=lemmatise)
 
 def process_text(text, lemmatise=False, show_times=False):
-    """Applies text processing techniques to the raw input text, which includes: 
-        - convert to lower case;
-        - replace non-unicode characters with valid counterparts
-        - remove special characters 
-        - tokenization of the text
-        - stopwords removal
-        - conversion of numbers to textual representation
-        - lemmatisation
+    """Applies text processing techniques to the raw input text using the shared
+    pipeline (see TextPipeline.process).
     
     Arguments:
         text {string} -- raw text as string
@@ -26,47 +267,37 @@ def process_text(text, lemmatise=False, show_times=False):
     Returns:
         string -- the transformed text
     """
-    steps = ['1. to lowercase', '2. to ACII and utf8', '3. remove special chars', \
-        '4. tokenization', '5. stop words', '6. num2words', '7. lemmatisation']
-    step_times = [time.time()]
-
-    # 1. Transform all characters in lowercase
-    text = to_lower(text)
-    step_times.append(time.time())
+    return get_pipeline().process(text, lemmatise=lemmatise, show_times=show_times)
 
-    # 2. Replace all compatibility characters with their equivalents (i.e. accented)
-    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf8')
-    step_times.append(time.time())
-
-    # 3. Remove special characters (punctuation, extra spaces)
-    text = remove_specials(text)
-    step_times.append(time.time())
-
-    # 4. Tokenization
-    toks = nltk.word_tokenize(text)
-    step_times.append(time.time())
-
-    # 5. Stopwords removal
-    toks = remove_stopwords(toks)
-    step_times.append(time.time())
-
-    # 6. Convert to number to text representation
-    toks = replace_nums2words(toks)
-    step_times.append(time.time())
+def regex_tokenize(text):
+    """Splits a text without punctuation (see remove_specials) in words, giving the same
+    tokens of nltk.word_tokenize: the sentence splitting and the punctuation rules of
+    nltk have nothing to do, so only the whitespaces and the contractions are split.
+    
+    Arguments:
+        text {string} -- text without punctuation
+    
+    Returns:
+        list[string] -- the tokens
+    """
+    text = ' ' + text + ' '
+    if ANY_CONTRACTION_REGEX.search(text):
+        for regex in CONTRACTIONS_REGEX:
+            text = regex.sub(r' \1 \2 ', text)
+    return text.split()
 
-    # 7. Lemmatisation
-    if lemmatise:
-        toks = lemmatisation(toks)
-    step_times.append(time.time())
+def word_tokenize(text):
+    import nltk
+    return nltk.word_tokenize(text)
 
-    if show_times:
-        _print_times(steps, step_times)
-    
-    return ' '.join(toks)
+TOKENIZERS = {REGEX: regex_tokenize, NLTK: word_tokenize}
 
 def to_lower(text):
     return text.lower()
 
+def to_ascii(text):
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf8')
+
 def remove_specials(sentence):
     """Removes special characters (non-alphanumeric).
     
@@ -77,7 +308,7 @@ def remove_specials(sentence):
         string -- text with special characters removed.
     """
     sentence = sentence.replace('-', ' ')
-    sentence = re.sub(r'[^\w\s]', '', sentence)
+    sentence = SPECIALS_REGEX.sub('', sentence)
     return sentence
 
 def remove_stopwords(tokens):
@@ -89,11 +320,7 @@ def remove_stopwords(tokens):
     Returns:
         list[string] -- transformed words
     """
-    words = []
-    for word in tokens:
-        if word not in stopwords.words('english'):
-            words.append(word)
-    return words
+    return get_pipeline().remove_stopwords(tokens)
 
 def replace_nums2words(tokens):
     """Replaces the numbers with their textual counterpart.
@@ -104,14 +331,7 @@ def replace_nums2words(tokens):
     Returns:
         list[string] -- transformed words
     """
-    e = inflect.engine()
-    words = []
-    for word in tokens:
-        if word.isdigit():
-            words.append(e.number_to_words(word).replace(',', ''))
-        else:
-            words.append(word)
-    return words
+    return get_pipeline().replace_nums2words(tokens)
 
 def lemmatisation(tokens):
     """Apply lemmatisation on a tokenised text.
@@ -122,33 +342,18 @@ def lemmatisation(tokens):
     Returns:
         list[string] -- lemmatised words
     """
-    pos_tag = nltk.pos_tag(tokens)
-    lemmatiser = nltk.WordNetLemmatizer()
-    wornet_tags = {"J": wordnet.ADJ, "N": wordnet.NOUN, "V": wordnet.VERB, "R": wordnet.ADV}
-    words = []
-    for word, tag in pos_tag:
-        proper_tag = wornet_tags.get(tag[0].upper(), wordnet.NOUN)
-        words.append(lemmatiser.lemmatize(word, proper_tag))
-    return words
-
-def _print_times(names, times):
+    return get_pipeline().lemmatisation(tokens)
+
+def _print_times(names, durations):
     """Utility function to print the processing time for each step.
     
     Arguments:
-        names {string} -- step name
-        times {float} -- timestamp for each step
+        names {list[string]} -- step names
+        durations {list[float]} -- duration (s) of each step
     """
-    sec2ms = lambda x: round(x * 1000, 1)
-
-    for i, e in reversed(list(enumerate(times))):
-        times[i] = e - times[i-1]
-    times = times[1:]
-
-    name_time = dict(zip(names, times))
+    sec2ms = lambda x: round(x * 1000, 3)
 
-    df = pd.DataFrame.from_dict({'step':names, 'time (ms)':times})
-    print(df)
-    print('\nText processing performance: (total: ', sec2ms(sum(times)), ' ms)', sep='')
-    for step, time in name_time.items():
-        print('\t', step, ':', sec2ms(time), 'ms')
-    print()
\ No newline at end of file
+    print('\nText processing performance: (total: ', sec2ms(sum(durations)), ' ms)', sep='')
+    for step, duration in zip(names, durations):
+        print('\t', step, ':', sec2ms(duration), 'ms')
+    print()
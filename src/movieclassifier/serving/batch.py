@@ -0,0 +1,123 @@
+import csv
+import json
+from itertools import islice
+from multiprocessing import Pool
+from movieclassifier.model.Model import Model
+
+CSV = 'csv'
+JSONL = 'jsonl'
+INVALID_RECORD = 'expected a title and a description'
+
+def read_records(file, file_format):
+    """Reads the title/description records one at a time from an open file. A missing
+    field, or a line which is not a JSON object, is read as None (see predict_records).
+    
+    Arguments:
+        file {file} -- the open input file
+        file_format {string} -- either 'csv' (with a header) or 'jsonl'
+    
+    Returns:
+        iterator[tuple] -- (title, description) of each record
+    """
+    if file_format == CSV:
+        for row in csv.DictReader(file):
+            yield row.get('title'), row.get('description')
+    elif file_format == JSONL:
+        for line in file:
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                if not isinstance(row, dict):
+                    row = {}
+                yield row.get('title'), row.get('description')
+    else:
+        raise ValueError("No such format:", file_format)
+
+def chunks(iterable, size):
+    """Splits an iterable in lists of at most size elements, without reading it all.
+    
+    Arguments:
+        iterable {iterable} -- elements to split
+        size {int} -- number of elements per chunk
+    
+    Returns:
+        iterator[list] -- the chunks
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+def _prepare_chunk(observations):
+    return [Model.prepare_text(title, desc) for title, desc in observations]
+
+def _is_valid(title, desc):
+    return isinstance(title, str) and isinstance(desc, str)
+
+def predict_records(model, records, chunk_size=1000, workers=1, cache=None):
+    """Predicts the genres of every record, one chunk at a time, so that only a chunk
+    is kept in memory. The text of a chunk is preprocessed by a pool of processes, then
+    the whole chunk is predicted with one call of the model. A record without a title or
+    a description (as strings) is not predicted: its output has an error instead of the
+    genres, so that there is still one output per record.
+    
+    Arguments:
+        model {Model} -- the loaded model
+        records {iterable[tuple]} -- (title, description) of each movie
+    
+    Keyword Arguments:
+        chunk_size {int} -- number of records predicted together (default: {1000})
+        workers {int} -- number of processes for text preprocessing (default: {1})
+        cache {PredictionCache} -- cache of the predictions of the model (default: {None})
+    
+    Returns:
+        iterator[dict] -- the prediction of each record, in the input order
+    """
+    predictor = cache if cache is not None else model
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        for chunk in chunks(enumerate(records, 1), chunk_size):
+            valid = [(title, desc) for _, (title, desc) in chunk if _is_valid(title, desc)]
+            if pool is not None and valid:
+                part_size = -(-len(valid) // workers)
+                parts = pool.map(_prepare_chunk, list(chunks(valid, part_size)))
+                texts = [text for part in parts for text in part]
+            else:
+                texts = _prepare_chunk(valid)
+
+            labels = iter(predictor.predict_labels(texts) if texts else [])
+            for number, (title, desc) in chunk:
+                if not _is_valid(title, desc):
+                    yield {'record': number, 'title': title, 'description': desc, 'error': INVALID_RECORD}
+                    continue
+                yield {\
+                    'title': title, \
+                    'description': desc, \
+                    'genre': list(next(labels))}
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+def write_predictions(predictions, file):
+    """Writes the predictions as JSON lines, in the same format of a single prediction.
+    
+    Arguments:
+        predictions {iterable[dict]} -- the predictions to write
+        file {file} -- the open output file
+    
+    Returns:
+        tuple -- number of written predictions, number of written errors
+    """
+    count = 0
+    errors = 0
+    for output in predictions:
+        file.write(json.dumps(output) + '\n')
+        if 'error' in output:
+            errors += 1
+        else:
+            count += 1
+    return count, errors
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+class BatchScheduler:
+    """Gathers the concurrent single-movie requests in micro-batches, so that each batch
+    is vectorized and scored with a single call of the model.
+
+    A batch is sent to the model when it reaches max_batch_size requests or when
+    max_wait seconds have passed since its first request, whichever comes first.
+    """
+
+    def __init__(self, model, max_batch_size=64, max_wait=0.005, cache=None):
+        """Constructor
+        
+        Arguments:
+            model {Model} -- the loaded model
+        
+        Keyword Arguments:
+            max_batch_size {int} -- maximum number of requests per batch (default: {64})
+            max_wait {float} -- maximum time (s) a request waits for the batch to fill (default: {0.005})
+            cache {PredictionCache} -- cache of the predictions of the model (default: {None})
+        """
+        self.model = model
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.n_batches = 0
+        self.n_requests = 0
+        self._pending = []
+        self._timer = None
+        self._loop = None
+
+    async def predict(self, title, description):
+        """Predicts the genre tags of a movie, batching it with the concurrent requests.
+        
+        Arguments:
+            title {string} -- title of the movie
+            description {string} -- a short description of the movie
+        
+        Returns:
+            tuple -- assigned genre tags, as returned by Model.predict_single
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((title, description, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        # the model runs in a thread, so that new requests keep being gathered
+        loop = asyncio.get_running_loop()
+        observations = [(title, description) for title, description, _ in batch]
+        self.n_batches += 1
+        self.n_requests += len(batch)
+        try:
+            labels = await loop.run_in_executor(None, self.predict_batch, observations)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), tags in zip(batch, labels):
+            if not future.done():
+                future.set_result(tags)
+
+    def predict_batch(self, observations):
+        """Predicts the genre tags of a batch of movies with one call of the model.
+        
+        Arguments:
+            observations {list[tuple]} -- (title, description) of each movie
+        
+        Returns:
+            list[tuple] -- assigned genre tags of each movie
+        """
+        texts = [self.model.prepare_text(title, desc) for title, desc in observations]
+        if self.cache is not None:
+            return self.cache.predict_labels(texts)
+        return self.model.predict_labels(texts)
+
+    def start_background(self):
+        """Runs an event loop in a background thread, so that the scheduler can be used
+        from synchronous code (i.e. the threads of an HTTP server) with predict_blocking.
+        """
+        self._loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        thread.start()
+
+    def predict_blocking(self, title, description):
+        """Same as predict, but blocks the calling thread until the result is ready.
+        Requires start_background to be called first.
+        
+        Arguments:
+            title {string} -- title of the movie
+            description {string} -- a short description of the movie
+        
+        Returns:
+            tuple -- assigned genre tags
+        """
+        future = asyncio.run_coroutine_threadsafe(self.predict(title, description), self._loop)
+        return future.result()
@@ -0,0 +1,120 @@
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+
+class PredictionCache:
+    """Bounded cache of the predictions of a model, keyed on a hash of the processed text,
+    so that texts normalizing to the same string are vectorized and scored only once.
+    The least recently used entry is evicted when the cache is full, and the whole cache
+    is cleared when the model or its threshold change.
+    """
+
+    def __init__(self, model, max_size=10000):
+        """Constructor
+        
+        Arguments:
+            model {Model} -- the model whose predictions are cached
+        
+        Keyword Arguments:
+            max_size {int} -- maximum number of cached predictions (default: {10000})
+        """
+        self.model = model
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = self._model_version()
+
+    def _model_version(self):
+        # the thresholds tuned per genre are an array, compared by value
+        threshold = getattr(self.model, 'threshold', None)
+        if isinstance(threshold, np.ndarray):
+            threshold = threshold.tobytes()
+        return (id(self.model), threshold, id(getattr(self.model, 'coef', None)))
+
+    def _check_version(self):
+        version = self._model_version()
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+    @staticmethod
+    def _key(text):
+        return hashlib.blake2b(text.encode('utf8'), digest_size=16).digest()
+
+    def clear(self):
+        """Removes all the cached predictions.
+        """
+        self._entries.clear()
+
+    def predict_labels(self, texts):
+        """Predicts the genre tags of a list of processed texts, as Model.predict_labels
+        does. Only the texts missing from the cache are predicted, with one call of the model.
+        
+        Arguments:
+            texts {list[string]} -- processed texts (see Model.prepare_text)
+        
+        Returns:
+            list[tuple] -- assigned genre tags of each text
+        """
+        keys = [self._key(text) for text in texts]
+        labels = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            self._check_version()
+            for i, key in enumerate(keys):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    labels[i] = self._entries[key]
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+                    self.misses += 1
+
+        if missing:
+            missing_texts = [texts[positions[0]] for positions in missing.values()]
+            missing_labels = self.model.predict_labels(missing_texts)
+            with self._lock:
+                for (key, positions), tags in zip(missing.items(), missing_labels):
+                    for i in positions:
+                        labels[i] = tags
+                    self._store(key, tags)
+        return labels
+
+    def predict_single(self, title, description, verbose=False):
+        """Predicts the genre tags of a movie, as Model.predict_single does.
+        
+        Arguments:
+            title {string} -- title of the movie
+            description {string} -- a short description of the movie
+        
+        Returns:
+            tuple -- assigned genre tags
+        """
+        text = self.model.prepare_text(title, description, verbose)
+        return self.predict_labels([text])[0]
+
+    def _store(self, key, tags):
+        self._entries[key] = tags
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """Returns the counters of the cache.
+        
+        Returns:
+            dict -- size, hits, misses, evictions and hit rate of the cache
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,179 @@
+import json
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from movieclassifier import instrumentation
+from movieclassifier.model.Model import Model
+from movieclassifier.serving.batching import BatchScheduler
+from movieclassifier.serving.cache import PredictionCache
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    """Handles the JSON prediction requests, using the model kept by the server.
+
+    POST /predict with {"title": ..., "description": ...} returns
+    {"title": ..., "description": ..., "genre": [...]}. When the instrumentation is
+    enabled, GET /metrics returns the stage timings in the Prometheus text format and
+    GET /metrics.json as a JSON snapshot.
+    """
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif self.path == '/stats' and self.server.cache is not None:
+            self._send_json(200, self.server.cache.stats())
+        elif self.path == '/metrics' and instrumentation.is_enabled():
+            self._send_text(200, instrumentation.REGISTRY.to_prometheus())
+        elif self.path == '/metrics.json' and instrumentation.is_enabled():
+            self._send_json(200, instrumentation.REGISTRY.snapshot())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length))
+            title = request['title']
+            desc = request['description']
+            if not isinstance(title, str) or not isinstance(desc, str):
+                raise TypeError('the title and the description must be strings')
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': 'expected a JSON object with a title and a description'})
+            return
+
+        try:
+            if self.server.batcher is not None:
+                labels = self.server.batcher.predict_blocking(title, desc)
+            elif self.server.cache is not None:
+                labels = self.server.cache.predict_single(title, desc)
+            else:
+                labels = self.server.model.predict_single(title, desc)
+        except Exception as error:
+            self.log_error('prediction failed: %r', error)
+            self._send_json(500, {'error': 'prediction failed'})
+            return
+        output = {\
+            'title': title, \
+            'description': desc, \
+            'genre': list(labels)}
+        self._send_json(200, output)
+
+    def _send_json(self, status, data):
+        self._send(status, json.dumps(data), 'application/json')
+
+    def _send_text(self, status, text):
+        self._send(status, text, 'text/plain; version=0.0.4')
+
+    def _send(self, status, text, content_type):
+        body = text.encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+class PredictionServer(ThreadingHTTPServer):
+    """HTTP server that keeps the model and the text preprocessing resources loaded
+    in memory between requests. If a BatchScheduler is given, the concurrent requests
+    are predicted in micro-batches. If a PredictionCache is given, its counters are
+    available at GET /stats.
+    """
+
+    def __init__(self, address, model, quiet=False, batcher=None, cache=None):
+        super().__init__(address, PredictionHandler)
+        self.model = model
+        self.quiet = quiet
+        self.batcher = batcher
+        self.cache = cache
+
+def load_model(file_path):
+    """Loads a model from file, measuring the loading time and the memory it takes.
+    
+    Arguments:
+        file_path {string} -- file path of the model to load
+    
+    Returns:
+        tuple -- the model, the loading time (s) and the allocated memory (bytes)
+    """
+    tracemalloc.start()
+    start_time = time.time()
+    model = Model.load(file_path)
+    loading_time = time.time() - start_time
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return model, loading_time, memory
+
+def warm_up(model, n_requests=20):
+    """Runs a few predictions to load the lazy resources (i.e. nltk corpora) and measure
+    the latency of a single request.
+    
+    Arguments:
+        model {Model} -- the loaded model
+    
+    Keyword Arguments:
+        n_requests {int} -- number of predictions to run (default: {20})
+    
+    Returns:
+        float -- average latency of a prediction (s)
+    """
+    title = 'The Shawshank Redemption'
+    desc = 'In 1947 Portland, Maine, banker Andy Dufresne is convicted of murdering his wife.'
+    # the first prediction loads the corpora, so it is not timed
+    model.predict_single(title, desc)
+    start_time = time.time()
+    for _ in range(n_requests):
+        model.predict_single(title, desc)
+    return (time.time() - start_time) / n_requests
+
+def serve(model_path, host='127.0.0.1', port=8000, quiet=False, batch_size=1, batch_wait=0.005, cache_size=0, metrics=False):
+    """Loads the model once and answers the prediction requests until interrupted.
+    
+    Arguments:
+        model_path {string} -- file path of the model to serve
+    
+    Keyword Arguments:
+        host {string} -- address to listen on (default: {'127.0.0.1'})
+        port {int} -- port to listen on (default: {8000})
+        quiet {bool} -- whether to hide the request log (default: {False})
+        batch_size {int} -- maximum number of requests per micro-batch, 1 disables batching (default: {1})
+        batch_wait {float} -- maximum time (s) a request waits for its batch to fill (default: {0.005})
+        cache_size {int} -- maximum number of cached predictions, 0 disables the cache (default: {0})
+        metrics {bool} -- whether to record and export the stage timings (default: {False})
+    """
+    sec2ms = lambda x: round(x * 1000, 2)
+    model, loading_time, memory = load_model(model_path)
+    latency = warm_up(model)
+    # enabled after the warm-up, so that the exported timings are the ones of the requests
+    if metrics:
+        instrumentation.enable()
+
+    print('Model loading time:', sec2ms(loading_time), 'ms')
+    print('Model memory:', round(memory / 2**20, 1), 'MB')
+    print('Inference time per request:', sec2ms(latency), 'ms')
+
+    cache = None
+    if cache_size > 0:
+        cache = PredictionCache(model, max_size=cache_size)
+        print('Prediction cache: up to', cache_size, 'entries')
+
+    batcher = None
+    if batch_size > 1:
+        batcher = BatchScheduler(model, max_batch_size=batch_size, max_wait=batch_wait, cache=cache)
+        batcher.start_background()
+        print('Micro-batching: up to', batch_size, 'requests or', sec2ms(batch_wait), 'ms')
+
+    server = PredictionServer((host, port), model, quiet=quiet, batcher=batcher, cache=cache)
+    print('Serving on http://', host, ':', port, '/predict', sep='')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,16 +1,21 @@
 import os
-
+import json
 import argparse
+from multiprocessing import Pool
 from pathlib import Path
 from tqdm import tqdm
 import nltk
-from movieclassifier.preprocessing.data_preprocessing import process_data, load_data, save_data
-from movieclassifier.preprocessing.text_preprocessing import process_text
+import numpy as np
+import pandas as pd
+from movieclassifier.preprocessing.data_preprocessing import process_data, load_data, load_data_chunks, save_data, \
+    load_texts, row_hashes, data_format, COLUMNAR
+from movieclassifier.preprocessing.text_preprocessing import get_pipeline, TOKENIZERS, REGEX
 
 THIS_PATH = os.path.dirname(os.path.realpath(__file__))
 PROJECT_ROOT = str(Path(THIS_PATH).parent)
 DEFAULT_LOAD_PATH = PROJECT_ROOT + '/data/movies_metadata.csv'
-DEFAULT_SAVE_PATH = PROJECT_ROOT + '/data/movies_data_ready.csv'
+DEFAULT_SAVE_PATH = PROJECT_ROOT + '/data/movies_data_ready'
+CHUNK_SIZE = 500
 
 def get_arg_parser():
     """Routine for parsing the flags
@@ -19,29 +24,248 @@ def get_arg_parser():
         arg_parser: the argument parser
     """
     parser = argparse.ArgumentParser()
-    parser.add_argument('-s', '--savepath', default=DEFAULT_SAVE_PATH, help="specify where to save the processed data")
+    parser.add_argument('-s', '--savepath', default=DEFAULT_SAVE_PATH, help="specify where to save the processed data (as csv if it ends with .csv)")
     parser.add_argument('-f', '--filepath', default=DEFAULT_LOAD_PATH, help='filepath of the raw data')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='number of processes for text preprocessing')
+    parser.add_argument('-c', '--chunksize', type=int, default=None, help='stream the raw data in chunks of this many rows')
+    parser.add_argument('-l', '--lemmatise', action='store_true', help='lemmatise the overviews')
+    parser.add_argument('-t', '--tokenizer', choices=list(TOKENIZERS), default=REGEX, help='tokenizer of the overviews (same tokens, ' + REGEX + ' is faster)')
+    parser.add_argument('--memo', default=None, help='file of the number-word and lemma memo tables (default: next to the processed data)')
+    parser.add_argument('-i', '--incremental', action='store_true', help='reprocess only the rows inserted or modified since the previous run')
     return parser
 
-def ETL(df):
+def _process_chunk(args):
+    texts, lemmatise, tokenizer = args
+    pipeline = get_pipeline()
+    pipeline.tokenizer = tokenizer
+    processed = pipeline.process_series(pd.Series(texts), lemmatise=lemmatise).tolist()
+    # new memo entries are sent back, so that the main process can save them
+    return processed, pipeline.pop_memo_updates()
+
+def _forget_memo_updates():
+    # a forked worker inherits the memo updates of the main process, which already has them
+    get_pipeline().pop_memo_updates()
+
+def start_pool(workers):
+    """Starts a pool of processes for process_overviews.
+    
+    Arguments:
+        workers {int} -- number of processes
+    
+    Returns:
+        multiprocessing.Pool -- the pool
+    """
+    return Pool(workers, initializer=_forget_memo_updates)
+
+def process_overviews(texts, workers=1, lemmatise=False, pool=None):
+    """Applies the text processing to every text, one chunk at a time with the column-level
+    pipeline. With more than one worker, the chunks are processed by a pool of processes.
+    The results are collected in the original order, and the memo entries found by the
+    workers are merged in the memo tables of the shared pipeline.
+    
+    Arguments:
+        texts {pandas.Series} -- raw texts
+    
+    Keyword Arguments:
+        workers {int} -- number of processes (default: {1})
+        lemmatise {bool} -- whether to lemmatise the texts (default: {False})
+        pool {multiprocessing.Pool} -- pool of processes reused across calls (see
+            start_pool), instead of starting one with workers processes (default: {None})
+    
+    Returns:
+        list[string] -- the transformed texts
+    """
+    texts = list(texts)
+    tokenizer = get_pipeline().tokenizer
+    chunks = [(texts[i:i + CHUNK_SIZE], lemmatise, tokenizer) for i in range(0, len(texts), CHUNK_SIZE)]
+    processed = []
+    with tqdm(total=len(texts)) as progress:
+        if pool is not None or workers > 1:
+            pipeline = get_pipeline()
+            own_pool = start_pool(workers) if pool is None else None
+            try:
+                for chunk, memo_updates in (pool or own_pool).imap(_process_chunk, chunks):
+                    processed.extend(chunk)
+                    pipeline.update_memo(memo_updates)
+                    progress.update(len(chunk))
+            finally:
+                if own_pool is not None:
+                    own_pool.terminate()
+        else:
+            for chunk, _ in map(_process_chunk, chunks):
+                processed.extend(chunk)
+                progress.update(len(chunk))
+    return processed
+
+# the whole save path is kept, so that e.g. data/ready and data/ready.csv don't share files
+def memo_path(path_save):
+    return path_save + '.memo'
+
+def rows_path(path_save):
+    return path_save + '.rows'
+
+def output_fingerprint(path_save):
+    """Identifies the saved processed data by the path, size and modification time of the
+    file holding its overviews.
+    
+    Arguments:
+        path_save {string} -- filepath of the processed data
+    
+    Returns:
+        dict -- the fingerprint, or None if there is no such data
+    """
+    path = os.path.join(path_save, 'overview.txt') if data_format(path_save) == COLUMNAR else path_save
+    if not Path(path).is_file():
+        return None
+    stat = os.stat(path)
+    return {'path': os.path.realpath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def save_rows(path, hashes, settings, output):
+    """Saves the hashes of the raw rows of the processed data (one per processed row, in
+    the same order), the settings of the text processing and the fingerprint of the
+    processed data they describe.
+    
+    Arguments:
+        path {string} -- file path of the row hashes
+        hashes {numpy.ndarray} -- uint64 hash of each processed row (see row_hashes)
+        settings {dict} -- settings of the text processing
+        output {dict} -- fingerprint of the processed data (see output_fingerprint)
+    """
+    # written in a temporary file and renamed, so a partial file is never read
+    with open(path + '.tmp', 'wb') as file:
+        np.savez(file, hashes=np.asarray(hashes, dtype=np.uint64), settings=json.dumps(settings, sort_keys=True), \
+            output=json.dumps(output, sort_keys=True))
+    os.replace(path + '.tmp', path)
+
+def load_rows(path, settings, output):
+    """Loads the hashes of the raw rows of the processed data, if they were saved with
+    the same settings of the text processing and still describe the same processed data.
+    
+    Arguments:
+        path {string} -- file path of the row hashes
+        settings {dict} -- settings of the text processing
+        output {dict} -- fingerprint of the processed data (see output_fingerprint)
+    
+    Returns:
+        numpy.ndarray -- uint64 hash of each processed row, or None
+    """
+    if not Path(path).is_file() or output is None:
+        return None
+    with np.load(path) as rows:
+        if 'output' not in rows or json.loads(str(rows['output'])) != output:
+            return None
+        if json.loads(str(rows['settings'])) != settings:
+            return None
+        return rows['hashes']
+
+def remove_rows(path):
+    if Path(path).is_file():
+        os.remove(path)
+
+def print_memo_stats(pipeline):
+    for name, table in pipeline.memo_tables.items():
+        stats = table.stats()
+        print(name, 'memo:', stats['size'], 'entries,', stats['hits'], 'hits,', stats['misses'],
+            'misses (hit rate', '{:.1%})'.format(stats['hit_rate']))
+
+def ETL(df, workers=1, seen_rows=None, lemmatise=False, pool=None):
     """Transformes the raw dataframe, making it ready to used in the training stage.
     
     Arguments:
         df {pandas.DataFrame} -- unprocessed dataframe
     
+    Keyword Arguments:
+        workers {int} -- number of processes for text preprocessing (default: {1})
+        seen_rows {set} -- hashes of the rows already processed, when streaming (default: {None})
+        lemmatise {bool} -- whether to lemmatise the overviews (default: {False})
+        pool {multiprocessing.Pool} -- pool of processes shared by the chunks, when
+            streaming (default: {None})
+    
     Returns:
         pandas.DataFrame -- transformed dataframe.
     """
     print('\nData cleaning...', end=' ')
     print('done.')
+    df = process_data(df, seen_rows=seen_rows)
+
+    print('\nText preprocessing and cleaning...')
+    df['overview'] = process_overviews(df['overview'], workers=workers, lemmatise=lemmatise, pool=pool)
+    return df
+
+def incremental_ETL(df, path_save, workers=1, lemmatise=False):
+    """Transformes the raw dataframe as ETL, reusing the processed overviews of the
+    previous run saved in path_save. The raw rows are matched by the hash of their content
+    (see row_hashes), so only the rows inserted or modified since then are preprocessed,
+    and the deleted ones are no longer part of the output. The data cleaning runs on
+    every row, since the duplicates depend on the whole dataset. The result is the same
+    of ETL.
+    
+    Arguments:
+        df {pandas.DataFrame} -- unprocessed dataframe
+        path_save {string} -- filepath of the processed data of the previous run
+    
+    Keyword Arguments:
+        workers {int} -- number of processes for text preprocessing (default: {1})
+        lemmatise {bool} -- whether to lemmatise the overviews (default: {False})
+    
+    Returns:
+        tuple -- (transformed dataframe, uint64 hash of the raw row of each transformed row)
+    """
+    hashes = row_hashes(df)
+    print('\nData cleaning...', end=' ')
     df = process_data(df)
+    hashes = hashes.loc[df.index].to_numpy()
+    print('done.')
+
+    # processed overviews of the previous run, by hash of their raw row
+    previous = {}
+    previous_hashes = load_rows(rows_path(path_save), processing_settings(lemmatise), output_fingerprint(path_save))
+    if previous_hashes is not None:
+        overviews = load_texts(path_save, 'overview')
+        if len(overviews) == len(previous_hashes):
+            previous = dict(zip(previous_hashes.tolist(), overviews))
+    if not previous:
+        print('No previous run with the same settings: processing every row.')
+
+    is_new = np.array([row_hash not in previous for row_hash in hashes.tolist()], dtype=bool)
+    n_deleted = len(previous) - (len(hashes) - is_new.sum())
+    print('Rows: ', len(hashes) - is_new.sum(), ' unchanged, ', is_new.sum(), ' inserted or modified, ', \
+        n_deleted, ' deleted.', sep='')
 
     print('\nText preprocessing and cleaning...')
-    df['overview'] = df['overview'].progress_apply(process_text)
+    processed = iter(process_overviews(df['overview'][is_new], workers=workers, lemmatise=lemmatise))
+    df['overview'] = [next(processed) if new else previous[row_hash] for row_hash, new in zip(hashes.tolist(), is_new)]
+    return df, hashes
 
-    # Make genres colum easy to separate as str
-    df['genres'] = df['genres'].apply(lambda x: ','.join(x))
-    return df
+def processing_settings(lemmatise):
+    # the processed overviews of a previous run can be reused only with the same settings
+    return {'lemmatise': bool(lemmatise), 'tokenizer': get_pipeline().tokenizer}
+
+def stream_ETL(path_load, path_save, chunk_size, workers=1, lemmatise=False):
+    """Transformes the raw data chunk by chunk, appending each transformed chunk to the
+    output file. Only one chunk at a time is kept in memory.
+    
+    Arguments:
+        path_load {string} -- filepath of the raw data
+        path_save {string} -- filepath of the processed data
+        chunk_size {int} -- number of rows per chunk
+    
+    Keyword Arguments:
+        workers {int} -- number of processes for text preprocessing (default: {1})
+        lemmatise {bool} -- whether to lemmatise the overviews (default: {False})
+    """
+    # hashes of the rows seen so far, to remove duplicates across chunks
+    seen_rows = set()
+    # the worker processes are started once for all the chunks
+    pool = start_pool(workers) if workers > 1 else None
+    try:
+        for i, chunk in enumerate(load_data_chunks(path_load, chunk_size)):
+            print('\nChunk', i + 1, '(rows', i * chunk_size, '-', i * chunk_size + len(chunk), ')')
+            chunk = ETL(chunk, workers=workers, seen_rows=seen_rows, lemmatise=lemmatise, pool=pool)
+            save_data(chunk, path_save, append=i > 0)
+    finally:
+        if pool is not None:
+            pool.terminate()
 
 if __name__ == "__main__":
     argparser = get_arg_parser()
@@ -57,15 +281,41 @@ if __name__ == "__main__":
 
     print("Using the following dataset: ", path_load)
 
-    # Creates a new tqdm instance with pandas
-    tqdm.pandas()
+    # Warm-start the memo tables with the ones of the previous runs
+    pipeline = get_pipeline()
+    pipeline.tokenizer = args['tokenizer']
+    path_memo = args['memo'] or memo_path(path_save)
+    if Path(path_memo).is_file():
+        print("Using the memo tables in", path_memo)
+        pipeline.load_memo(path_memo)
+
+    # Load data, transform it and save it. The hashes of the raw rows are saved next to
+    # the processed data, so that the next runs can be incremental
+    path_rows = rows_path(path_save)
+    if args['chunksize']:
+        if args['incremental']:
+            print('Error: the incremental mode does not stream the raw data, drop -c!')
+            exit()
+        remove_rows(path_rows)
+        print("Streaming processed data to", path_save, '...')
+        stream_ETL(path_load, path_save, args['chunksize'], workers=args['workers'], lemmatise=args['lemmatise'])
+    else:
+        df = load_data(path_load)
+        if args['incremental']:
+            df, hashes = incremental_ETL(df, path_save, workers=args['workers'], lemmatise=args['lemmatise'])
+        else:
+            hashes = row_hashes(df)
+            df = ETL(df, workers=args['workers'], lemmatise=args['lemmatise'])
+            hashes = hashes.loc[df.index].to_numpy()
 
-    # Load data, transform it and save it
-    df = load_data(path_load)
-    df = ETL(df)
+        print("Saving processed data as", path_save, '...')
+        # the old hashes no longer match the data while it is being saved
+        remove_rows(path_rows)
+        save_data(df, path_save)
+        save_rows(path_rows, hashes, processing_settings(args['lemmatise']), output_fingerprint(path_save))
 
-    print("Saving processed data as", path_save, '...')
-    save_data(df, path_save)
+    print_memo_stats(pipeline)
+    pipeline.save_memo(path_memo)
 
 
 
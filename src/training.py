@@ -3,20 +3,32 @@ import time
 import argparse
 from pathlib import Path
 from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.multiclass import OneVsRestClassifier
 from sklearn.svm import LinearSVC
 from movieclassifier.model.Model import Model
 from movieclassifier.model.OvRModel import OvRModel
-from movieclassifier.preprocessing.data_preprocessing import load_data
+from movieclassifier.model.HashingOvRModel import HashingOvRModel
+from movieclassifier.model.linear import SGD_LOG_LOSS
+from movieclassifier.model.feature_cache import FeatureCache
+from movieclassifier.model.search import search, build_model, load_search_space, DEFAULT_SPACE
+from movieclassifier.preprocessing.data_preprocessing import load_data, data_format, CSV
 from movieclassifier.preprocessing.text_preprocessing import process_text
 from beautifultable import BeautifulTable
 
 THIS_PATH = os.path.dirname(os.path.realpath(__file__))
 PROJECT_ROOT = str(Path(THIS_PATH).parent)
-DEFAULT_LOAD_PATH = PROJECT_ROOT + '/data/movies_data_ready.csv'
+DEFAULT_LOAD_PATH = PROJECT_ROOT + '/data/movies_data_ready'
 DEFAULT_SAVE_PATH = PROJECT_ROOT + '/models/model.hal'
 OVR = 'Ovr'
+OVR_SGD = 'OvrSGD'
+OVR_HASHING = 'OvrHashing'
+TRAIN = 'train'
+SEARCH = 'search'
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_FEATURES = 2**18
+# flags of a single model, set by the search space in search mode
+MODEL_FLAGS = {'model': '-m/--model', 'threshold': '--threshold', 'features': '--features', 'update': '-u/--update'}
 
 def get_arg_parser():
     """Routine for parsing the flags
@@ -25,82 +37,201 @@ def get_arg_parser():
         arg_parser: the argument parser
     """
     parser = argparse.ArgumentParser()
-    parser.add_argument('-s', '--savepath', default=DEFAULT_SAVE_PATH, help="specify where to save the trained model", action='store_true')
+    parser.add_argument('mode', nargs='?', choices=[TRAIN, SEARCH], default=TRAIN, help="train one model, or " + SEARCH + \
+        " the vectorizer and estimator configurations for the best one")
+    parser.add_argument('-s', '--savepath', default=DEFAULT_SAVE_PATH, help="specify where to save the trained model")
     parser.add_argument('-f', '--filepath', default=DEFAULT_LOAD_PATH, help='filepath cleaned data')
-    parser.add_argument('-m', '--model', default=OVR, help="model to train")
+    parser.add_argument('-m', '--model', default=None, help="model to train: " + OVR + ", " + OVR_HASHING + \
+        " (hashed features) or " + OVR_SGD + " (hashed features, can be updated) (default: " + OVR + ")")
     parser.add_argument('--testsize', type=float, default=0.2, help="size of the test set")
-    parser.add_argument('--threshold', type=float, default=0.2, help="threshold of the model")
+    parser.add_argument('--threshold', type=float, default=None, help="threshold of the model (default: " + str(DEFAULT_THRESHOLD) + ")")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="number of processes training the genres in parallel (-1 for all cores)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed of the estimators")
+    parser.add_argument('--tune', choices=['micro', 'macro'], default=None, help="tune a threshold per genre on a validation set, maximizing the micro or macro F1 score")
+    parser.add_argument('--cache', default=None, help="directory caching the vectorized training sets, reused by the next runs on the same data")
+    parser.add_argument('-u', '--update', default=None, help="update this " + OVR_SGD + " model with the data instead of training a new one")
+    parser.add_argument('--features', type=int, default=None, help="number of hashed features of the " + OVR_HASHING + " and " + OVR_SGD + \
+        " models (default: " + str(DEFAULT_FEATURES) + ")")
+    parser.add_argument('--space', default=None, help="JSON file of the search space (default: a small grid of LogisticRegression and LinearSVC)")
+    parser.add_argument('--iter', type=int, default=None, help="sample this many configurations of the search space (random search) instead of all of them")
+    parser.add_argument('--folds', type=int, default=3, help="number of cross validation folds of the search")
+    parser.add_argument('--top', type=int, default=10, help="number of search results printed")
     return parser
 
-def split_train_val_test(self, X, y, test_val_size=0.15, random_seed=42):
-        """Splits the data in three sets: training, validation, test.
-        
-        Arguments:
-            X {pandas.Series} -- 1D array containing the text for each example
-            y {numpy.ndarray} -- 1D array with the labels for each example
-        
-        Keyword Arguments:
-            test_val_size {float} -- proportion of the test and validation sets (default: {0.15})
-            random_seed {int} -- seed for random shuffle (default: {42})
-        
-        Returns:
-            Tuple -- split of X, y in x_train, x_val, x_test, y_train, y_val, y_test
-        """
-        x_train, x_test, y_train, y_test = train_test_split(X, y, \
-                test_size=test_val_size, random_state=random_seed)
+def split_train_val_test(X, y, test_val_size=0.15, random_seed=42):
+    """Splits the data in three sets: training, validation, test.
+    
+    Arguments:
+        X {pandas.Series} -- 1D array containing the text for each example
+        y {numpy.ndarray} -- 1D array with the labels for each example
+    
+    Keyword Arguments:
+        test_val_size {float} -- proportion of the test and validation sets (default: {0.15})
+        random_seed {int} -- seed for random shuffle (default: {42})
+    
+    Returns:
+        Tuple -- split of X, y in x_train, x_val, x_test, y_train, y_val, y_test
+    """
+    x_train, x_test, y_train, y_test = train_test_split(X, y, \
+        test_size=test_val_size, random_state=random_seed)
 
-        validation_size_relative = test_val_size/(1-test_val_size)
+    validation_size_relative = test_val_size/(1-test_val_size)
 
-        x_train, x_val, y_train, y_val = train_test_split(x_train, y_train, \
-                test_size=validation_size_relative, random_state=random_seed)
-        return x_train, x_val, x_test, y_train, y_val, y_test
+    x_train, x_val, y_train, y_val = train_test_split(x_train, y_train, \
+        test_size=validation_size_relative, random_state=random_seed)
+    return x_train, x_val, x_test, y_train, y_val, y_test
 
 def print_stats_table(stats, threshold):
-    """Prints a table of stats about the model.
+    """Prints a table of stats about the model, or about several models (one row each).
     
     Arguments:
-        stats {dict} -- name value map
-        threshold {float} -- threshold value
+        stats {dict} -- name value map, or a list of maps with the same names
+        threshold {float} -- threshold value, or a list of values
     """
-    table = BeautifulTable()
+    if isinstance(stats, dict):
+        stats, threshold = [stats], [threshold]
+    table = BeautifulTable(maxwidth=160)
     table.set_style(BeautifulTable.STYLE_BOX_ROUNDED)
     # table header
-    headers = list(stats.keys())
+    headers = list(stats[0].keys())
     headers.append('Threshold')
     table.column_headers = headers
     # table content
-    row = list(stats.values())
-    row.append(threshold)
-    table.append_row(row)
+    for model_stats, model_threshold in zip(stats, threshold):
+        row = list(model_stats.values())
+        row.append(model_threshold)
+        table.append_row(row)
+    print('\n', table, end='\n', sep='')
+
+def print_search_table(results, top=10):
+    """Prints the best results of a search, ranked by F1 score.
+    
+    Arguments:
+        results {list[dict]} -- results of search, best first
+    
+    Keyword Arguments:
+        top {int} -- number of results printed (default: {10})
+    """
+    stats = []
+    for rank, result in enumerate(results[:top], 1):
+        params = dict(result['vectorizer'], **result['params'])
+        stats.append({'Rank': rank, 'Estimator': result['estimator'], \
+            'Parameters': ', '.join(key + '=' + str(value) for key, value in params.items()), \
+            'Fit time (s)': round(result['Fit time (s)'], 2), 'Precision': result['Precision'], \
+            'Recall': result['Recall'], 'F1 score': result['F1 score']})
+    print_stats_table(stats, ['-' if result['threshold'] is None else result['threshold'] for result in results[:top]])
+
+def print_thresholds_table(genres, thresholds):
+    """Prints a table of the thresholds tuned for each genre.
+    
+    Arguments:
+        genres {list} -- the genres
+        thresholds {numpy.ndarray} -- threshold of each genre
+    """
+    table = BeautifulTable()
+    table.set_style(BeautifulTable.STYLE_BOX_ROUNDED)
+    table.column_headers = ['Genre', 'Threshold']
+    for genre, threshold in zip(genres, thresholds):
+        table.append_row([genre, round(float(threshold), 2)])
     print('\n', table, end='\n', sep='')
 
 if __name__ == "__main__":
     argparser = get_arg_parser()
     args = vars(argparser.parse_args())
 
-    df = load_data(DEFAULT_LOAD_PATH)
+    # the search space sets the model, its threshold and its vectorizer
+    if args['mode'] == SEARCH:
+        ignored = [flag for key, flag in MODEL_FLAGS.items() if args[key] is not None]
+        if ignored:
+            print('Error: the search space sets the model, drop ', ', '.join(ignored), '!', sep='')
+            exit()
+        if args['tune']:
+            print('The searched threshold of the best configuration will be replaced by a threshold per genre (--tune ', \
+                args['tune'], ').', sep='')
+    args['model'] = args['model'] or OVR
+    args['threshold'] = args['threshold'] if args['threshold'] is not None else DEFAULT_THRESHOLD
+    args['features'] = args['features'] or DEFAULT_FEATURES
+
+    # only a pickled OvR model with a vectorizer and estimators supporting partial_fit can be updated
+    update_model = None
+    if args['update']:
+        if not Path(args['update']).exists():
+            print('Error: \"', args['update'], '\" does not exist!', sep='')
+            exit()
+        update_model = Model.load(args['update'])
+        if not isinstance(update_model, OvRModel) or not hasattr(update_model.clf.estimator, 'partial_fit') \
+                or not hasattr(update_model.vectorizer, 'partial_fit'):
+            print('Error: \"', args['update'], '\" is not an ', OVR_SGD, ' model, it can\'t be updated!', sep='')
+            exit()
+
+    df = load_data(args['filepath'])
 
     print("Getting the data ready...", end=' ')
     # add title to the text
-    X = df['title'].apply(lambda x: x.lower()).astype(str) + ' ' + df['overview']
-    y = df['genres'].apply(lambda x: x.split(','))
-
-    # split the data into training set and test set
-    x_train, x_test, y_train, y_test = train_test_split(X, y, \
-        test_size=args['testsize'], random_state=42)
+    X = df['title'].astype(str).str.lower() + ' ' + df['overview']
+    y = df['genres']
+    if data_format(args['filepath']) == CSV:
+        y = y.str.split(',')
+
+    # split the data into training set and test set, and validation set to tune the thresholds
+    if args['tune']:
+        x_train, x_val, x_test, y_train, y_val, y_test = split_train_val_test(X, y, \
+            test_val_size=args['testsize'], random_seed=42)
+    else:
+        x_train, x_test, y_train, y_test = train_test_split(X, y, \
+            test_size=args['testsize'], random_state=42)
 
     print('OK\n', 'Training...', sep='')
 
     model = None
+    feature_cache = FeatureCache(args['cache']) if args['cache'] else None
     start_time = time.time()
 
+    # search the configurations with a cross validation on the training set, and train the best one
+    if args['mode'] == SEARCH:
+        space = load_search_space(args['space']) if args['space'] else DEFAULT_SPACE
+        results = search(x_train, y_train, space, n_iter=args['iter'], n_splits=args['folds'], \
+            n_jobs=args['jobs'], random_seed=args['seed'])
+        print_search_table(results, top=args['top'])
+        print('\nTraining the best configuration on the whole training set...')
+        model = build_model(results[0], n_jobs=args['jobs'], random_seed=args['seed'])
+        model.fit(x_train, y_train, feature_cache=feature_cache)
+
+    # update an existing model with the new data
+    elif args['update']:
+        model = update_model
+        model.partial_fit(x_train, y_train)
+
     # train the OvR model
-    if args['model'] == OVR:
-        base_classifier = LogisticRegression(solver='saga', n_jobs=1, max_iter=1000, verbose=True)
-        model = OvRModel(base_classifier, threshold=args['threshold'])
-        model.fit(x_train, y_train)
+    elif args['model'] == OVR:
+        base_classifier = LogisticRegression(solver='saga', n_jobs=1, max_iter=1000, verbose=True, \
+            random_state=args['seed'])
+        model = OvRModel(base_classifier, threshold=args['threshold'], n_jobs=args['jobs'])
+        model.fit(x_train, y_train, feature_cache=feature_cache)
+
+    # train the OvR model with hashed features
+    elif args['model'] == OVR_HASHING:
+        base_classifier = LogisticRegression(solver='saga', n_jobs=1, max_iter=1000, verbose=True, \
+            random_state=args['seed'])
+        model = HashingOvRModel(base_classifier, threshold=args['threshold'], n_features=args['features'], \
+            n_jobs=args['jobs'])
+        model.fit(x_train, y_train, feature_cache=feature_cache)
+
+    # train the OvR model with hashed features and SGD, which can be updated later
+    elif args['model'] == OVR_SGD:
+        base_classifier = SGDClassifier(loss=SGD_LOG_LOSS, random_state=args['seed'])
+        model = HashingOvRModel(base_classifier, threshold=args['threshold'], n_features=args['features'], \
+            n_jobs=args['jobs'])
+        model.fit(x_train, y_train, feature_cache=feature_cache)
+
+    if model is not None and args['tune']:
+        score = model.tune_thresholds(x_val, y_val, average=args['tune'])
+        print_thresholds_table(model.binarizer.classes_, model.threshold)
+        print('Validation ', args['tune'], ' F1 score with the tuned thresholds: ', round(score, 3), sep='')
 
     elapsed_sec = time.time() - start_time
+    if feature_cache is not None:
+        print('Vectorized training set', 'loaded from' if feature_cache.hits else 'saved to', 'the cache', args['cache'])
 
     if model == None:
         raise ValueError("No such model:", args['model'])
@@ -108,10 +239,11 @@ if __name__ == "__main__":
     # Only calculate stats if there is some test data
     if args['testsize'] > 0.01:
         stats = model.get_stats(x_test, y_test)
-        print_stats_table(stats, args['threshold'])
+        threshold = model.threshold if model.support_proba else '-'
+        print_stats_table(stats, 'tuned' if args['tune'] else threshold)
     
     # Save the model as file
     model.save(args['savepath'])
 
-    print("\nTotal training time:", round(elapsed_sec, 2), 's', end='\n')
+    print("\nTotal training time: ", round(elapsed_sec, 2), ' s (', args['jobs'], ' jobs)', sep='', end='\n')
     print("Model saved as \'", args['savepath'], "\'", sep='')
\ No newline at end of file
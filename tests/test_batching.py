@@ -0,0 +1,91 @@
+import io
+import json
+import asyncio
+import unittest
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from movieclassifier.model.OvRModel import OvRModel
+from movieclassifier.serving.batching import BatchScheduler
+from movieclassifier.serving.batch import read_records, predict_records, write_predictions, INVALID_RECORD
+from movieclassifier.serving.cache import PredictionCache
+
+MOVIES = [
+    ('Alien', 'A space crew is hunted by a deadly alien creature.', ['Horror', 'Science Fiction']),
+    ('The Thing', 'A research team in Antarctica is hunted by a shape-shifting alien.', ['Horror', 'Science Fiction']),
+    ('Notting Hill', 'A bookshop owner falls in love with a famous actress.', ['Comedy', 'Romance']),
+    ('Love Actually', 'Eight couples fall in love in the weeks before Christmas in London.', ['Comedy', 'Romance']),
+    ('Heat', 'A detective hunts a group of professional bank robbers in Los Angeles.', ['Crime', 'Drama']),
+    ('The Godfather', 'The aging patriarch of a crime dynasty transfers control to his son.', ['Crime', 'Drama']),
+]
+
+class TestBatching(unittest.TestCase):
+
+    def setUp(self):
+        x_train = pd.Series([OvRModel.prepare_text(title, desc) for title, desc, _ in MOVIES])
+        y_train = [genres for _, _, genres in MOVIES]
+        self.model = OvRModel(LogisticRegression(), threshold=0.4)
+        self.model.fit(x_train, y_train)
+
+    def test_batch_same_as_single(self):
+        scheduler = BatchScheduler(self.model, max_batch_size=4, max_wait=0.01)
+
+        async def predict_all():
+            requests = [scheduler.predict(title, desc) for title, desc, _ in MOVIES]
+            return await asyncio.gather(*requests)
+
+        post = asyncio.run(predict_all())
+        should = [self.model.predict_single(title, desc) for title, desc, _ in MOVIES]
+        self.assertEqual(post, should)
+        self.assertEqual(scheduler.n_requests, len(MOVIES))
+        self.assertEqual(scheduler.n_batches, 2)
+
+    def test_predict_records(self):
+        records = [(title, desc) for title, desc, _ in MOVIES]
+        post = [output['genre'] for output in predict_records(self.model, records, chunk_size=4)]
+        should = [list(self.model.predict_single(title, desc)) for title, desc in records]
+        self.assertEqual(post, should)
+
+    def test_read_records(self):
+        csv_file = io.StringIO('title,description\nHeat,"A detective, a robber."\n')
+        jsonl_file = io.StringIO(json.dumps({'title': 'Heat', 'description': 'A detective, a robber.'}) + '\n\n')
+        should = [('Heat', 'A detective, a robber.')]
+        self.assertEqual(list(read_records(csv_file, 'csv')), should)
+        self.assertEqual(list(read_records(jsonl_file, 'jsonl')), should)
+
+    def test_invalid_records(self):
+        lines = [{'title': 'Heat', 'description': 'A detective hunts a group of bank robbers.'}, \
+            {'title': 'Alien'}, {'title': 'Alien', 'description': None}, 'not a movie']
+        jsonl_file = io.StringIO('\n'.join(json.dumps(line) for line in lines) + '\n{"title": \n')
+        records = list(read_records(jsonl_file, 'jsonl'))
+        self.assertEqual(records[1:], [('Alien', None), ('Alien', None), (None, None), (None, None)])
+
+        output = io.StringIO()
+        count, errors = write_predictions(predict_records(self.model, records, chunk_size=2), output)
+        self.assertEqual((count, errors), (1, 4))
+        post = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(post[0]['genre'], list(self.model.predict_single(*records[0])))
+        self.assertEqual([output['record'] for output in post[1:]], [2, 3, 4, 5])
+        self.assertTrue(all('genre' not in output for output in post[1:]))
+
+        # a csv row missing the description column
+        csv_file = io.StringIO('title,description\nHeat,"A detective, a robber."\nAlien\n')
+        post = list(predict_records(self.model, read_records(csv_file, 'csv')))
+        self.assertIn('genre', post[0])
+        self.assertEqual(post[1]['error'], INVALID_RECORD)
+
+    def test_cache(self):
+        cache = PredictionCache(self.model, max_size=4)
+        texts = [OvRModel.prepare_text(title, desc) for title, desc, _ in MOVIES]
+        post = cache.predict_labels(texts[:3] + texts[:3])
+        should = self.model.predict_labels(texts[:3] + texts[:3])
+        self.assertEqual(post, should)
+        self.assertEqual(cache.stats()['misses'], 6)
+
+        cache.predict_labels(texts)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['evictions'], stats['size']), (3, 2, 4))
+
+        # a new threshold invalidates the cached predictions
+        self.model.threshold = 0.9
+        cache.predict_labels(texts[-1:])
+        self.assertEqual(cache.stats()['size'], 1)
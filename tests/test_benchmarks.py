@@ -0,0 +1,16 @@
+import unittest
+from benchmarks.compare import compare
+from benchmarks.synthetic import make_records
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_make_records(self):
+        df = make_records(50, seed=1)
+        self.assertEqual(list(df.columns), ['title', 'overview', 'genres'])
+        self.assertTrue(df.equals(make_records(50, seed=1)))
+
+    def test_compare(self):
+        baseline = {'results': {'fast': {'p50_ms': 1.0}, 'slow': {'p50_ms': 1.0}, 'old': {'p50_ms': 1.0}}}
+        current = {'results': {'fast': {'p50_ms': 1.05}, 'slow': {'p50_ms': 1.5}, 'new': {'p50_ms': 1.0}}}
+        post = [(name, regression) for name, _, _, _, regression in compare(baseline, current, tolerance=0.1)]
+        self.assertEqual(post, [('fast', False), ('slow', True)])
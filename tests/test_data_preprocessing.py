@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 import pandas as pd
 import movieclassifier.preprocessing.data_preprocessing as datp
@@ -40,3 +42,97 @@ class TestDataPreprocessing(unittest.TestCase):
         post = datp.process_data(df)
         genres = post['genres']
         self.assertIs(type(genres[0]), list)
+
+    def test_data_preprocessing_chunks(self):
+        df = datp.load_data(FILE_PATH)
+        should = datp.process_data(df)
+        seen_rows = set()
+        chunks = [datp.process_data(chunk, seen_rows) for chunk in datp.load_data_chunks(FILE_PATH, 5000)]
+        post = pd.concat(chunks)
+        self.assertTrue(post.equals(should))
+
+    def test_data_preprocessing_chunks_types(self):
+        # the second chunk has a missing title, so pandas would infer its titles as float
+        genres = "\"[{'id': 18, 'name': 'Drama'}]\""
+        rows = ['release_date,title,overview,genres', '1992-10-09,1492,columbus sails west,' + genres, \
+            '1995-12-15,1917,two soldiers,' + genres, '1992-10-09,1492,columbus sails west,' + genres, \
+            '1995-12-15,,no title,' + genres]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'movies_metadata.csv')
+            with open(file_path, 'w') as file:
+                file.write('\n'.join(rows) + '\n')
+            seen_rows = set()
+            chunks = [datp.process_data(chunk, seen_rows) for chunk in datp.load_data_chunks(file_path, 2)]
+        post = pd.concat(chunks)
+        self.assertEqual(list(post['title']), ['1492', '1917'])
+
+    def test_save_load_columnar(self):
+        df = pd.DataFrame({'title': ['GoldenEye', 'Heat', 'Toy Story'], \
+            'overview': ['james bond must unmask', 'obsessive master thief', ''], \
+            'genres': [['Action', 'Thriller'], ['Crime'], ['Action', 'Thriller']]})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dir_path = os.path.join(tmp_dir, 'movies_data_ready')
+            datp.save_data(df[:2], dir_path)
+            datp.save_data(df[2:], dir_path, append=True)
+            post = datp.load_data(dir_path)
+        self.assertEqual(list(post.columns), ['title', 'overview', 'genres'])
+        self.assertEqual(list(post['title']), list(df['title']))
+        self.assertEqual(list(post['overview']), list(df['overview']))
+        self.assertEqual([list(genres) for genres in post['genres']], list(df['genres']))
+
+    def test_data_format(self):
+        df = pd.DataFrame({'title': ['Heat'], 'overview': ['obsessive master thief'], 'genres': ['Crime']})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # the raw data may be compressed or have no extension, it's still csv
+            for name in ('movies.csv.gz', 'movies'):
+                file_path = os.path.join(tmp_dir, name)
+                df.to_csv(file_path, index=False)
+                self.assertEqual(datp.data_format(file_path), datp.CSV)
+                self.assertTrue(datp.load_data(file_path).equals(df))
+            self.assertEqual(datp.data_format(tmp_dir), datp.COLUMNAR)
+            self.assertEqual(datp.data_format(os.path.join(tmp_dir, 'movies_data_ready')), datp.COLUMNAR)
+            self.assertEqual(datp.data_format(os.path.join(tmp_dir, 'movies_data_ready.csv')), datp.CSV)
+
+    def test_save_csv(self):
+        df = pd.DataFrame({'title': ['Heat'], 'overview': ['obsessive master thief'], \
+            'genres': [['Action', 'Crime']]})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'movies_data_ready.csv')
+            datp.save_data(df, file_path)
+            post = datp.load_data(file_path)
+        self.assertEqual(post['genres'][0], 'Action,Crime')
+
+    def test_load_texts(self):
+        df = pd.DataFrame({'title': ['Heat', '1492'], 'overview': ['obsessive master thief', ''], \
+            'genres': [['Crime'], ['Drama']]})
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ('movies_data_ready.csv', 'movies_data_ready'):
+                file_path = os.path.join(tmp_dir, name)
+                datp.save_data(df, file_path)
+                self.assertEqual(datp.load_texts(file_path, 'title'), ['Heat', '1492'])
+                self.assertEqual(datp.load_texts(file_path, 'overview'), ['obsessive master thief', ''])
+
+    def test_row_hashes(self):
+        df = pd.DataFrame({'id': [1, 2, 3], 'release_date': ['1995-12-15'] * 3, 'title': ['Heat'] * 3, \
+            'overview': ['obsessive master thief', 'obsessive master thief', 'master thief'], \
+            'genres': ["[{'id': 80, 'name': 'Crime'}]"] * 3, 'popularity': [1.0, 2.0, 3.0]})
+        hashes = datp.row_hashes(df)
+        self.assertEqual(len(set(hashes)), 3)
+        # the columns which are not part of the content are ignored
+        df['popularity'] = 0.0
+        self.assertTrue(hashes.equals(datp.row_hashes(df)))
+        df.loc[2, 'overview'] = 'obsessive master thief'
+        self.assertNotEqual(datp.row_hashes(df)[2], hashes[2])
+
+    def test_data_preprocessing_rules(self):
+        drama = "[{'id': 18, 'name': 'Drama'}]"
+        df = pd.DataFrame({
+            'release_date': ['1995-01-01', '1995-01-01', None, '1995-01-01', '1995-01-01', '1995-01-01', '1995-01-01', '1995-01-01'],
+            'title': ['Heat', 'Heat', 'No date', 'Empty', 'Blank', 'Missing', 'No genres', 'Casino'],
+            'overview': ['thief', 'thief', 'plot', '', '   ', 'No overview found.', 'plot', 'mob'],
+            'genres': [drama, drama, drama, drama, drama, drama, '[]', "[{'id': 80, 'name': 'Crime'}, {'id': 18, 'name': 'Drama'}]"],
+        })
+        post = datp.process_data(df)
+        self.assertEqual(list(post['title']), ['Heat', 'Casino'])
+        self.assertEqual(list(post.index), [0, 7])
+        self.assertEqual(list(post['genres']), [['Drama'], ['Crime', 'Drama']])
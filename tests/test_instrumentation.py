@@ -0,0 +1,38 @@
+import unittest
+from movieclassifier import instrumentation
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        instrumentation.REGISTRY.reset()
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.REGISTRY.reset()
+
+    def test_disabled(self):
+        instrumentation.disable()
+        with instrumentation.timer('stage'):
+            pass
+        instrumentation.observe('stage', 0.1)
+        self.assertEqual(instrumentation.REGISTRY.snapshot(), {})
+
+    def test_histogram(self):
+        instrumentation.enable()
+        instrumentation.observe('stage', 0.00002)
+        instrumentation.observe('stage', 0.003)
+        instrumentation.observe('stage', 20)
+        stats = instrumentation.REGISTRY.snapshot()['stage']
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(stats['buckets']['2.5e-05'], 1)
+        self.assertEqual(stats['buckets']['0.005'], 2)
+        self.assertEqual(stats['buckets']['+Inf'], 3)
+
+    def test_prometheus(self):
+        instrumentation.enable()
+        with instrumentation.timer('model.score'):
+            pass
+        text = instrumentation.REGISTRY.to_prometheus()
+        self.assertIn('# TYPE movieclassifier_stage_seconds histogram', text)
+        self.assertIn('movieclassifier_stage_seconds_bucket{stage="model.score",le="+Inf"} 1', text)
+        self.assertIn('movieclassifier_stage_seconds_count{stage="model.score"} 1', text)
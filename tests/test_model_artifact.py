@@ -0,0 +1,92 @@
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from movieclassifier.model.Model import Model
+from movieclassifier.model.OvRModel import OvRModel
+from movieclassifier.model.HashingOvRModel import HashingOvRModel
+from movieclassifier.model.artifact import save_artifact, ArtifactModel
+
+TEXTS = ['space crew hunted deadly alien creature', 'research team antarctica hunted shape shifting alien', \
+    'bookshop owner falls love famous actress', 'eight couples fall love weeks christmas london', \
+    'detective hunts group professional bank robbers', 'aging patriarch crime dynasty transfers control son', \
+    'alien robbers fall love london']
+GENRES = [['Horror', 'Science Fiction'], ['Horror', 'Science Fiction'], ['Comedy', 'Romance'], \
+    ['Comedy', 'Romance'], ['Crime', 'Drama'], ['Crime', 'Drama'], ['Comedy', 'Crime', 'Science Fiction']]
+
+class TestModelArtifact(unittest.TestCase):
+
+    def setUp(self):
+        self.model = OvRModel(LogisticRegression(), threshold=0.4)
+        self.model.fit(pd.Series(TEXTS), GENRES)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        save_artifact(self.model, self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_artifact_load(self):
+        mod = Model.load(self.tmp_dir.name)
+        self.assertIsInstance(mod, ArtifactModel)
+        # inference only
+        self.assertNotIsInstance(mod, Model)
+        self.assertFalse(hasattr(mod, 'fit'))
+        self.assertEqual(list(mod.binarizer.classes_), list(self.model.binarizer.classes_))
+
+    def test_artifact_vectorizer(self):
+        mod = Model.load(self.tmp_dir.name)
+        texts = pd.Series(TEXTS + ['unknown words only', '', 'alien alien love'])
+        post = mod.vectorizer.transform(texts).toarray()
+        should = self.model.vectorizer.transform(texts).toarray()
+        self.assertTrue(np.allclose(post, should))
+
+    def test_artifact_predict(self):
+        mod = Model.load(self.tmp_dir.name)
+        texts = pd.Series(TEXTS + ['alien love', 'bank robbers in space'])
+        post = mod.predict(texts)
+        should = self.model.predict(texts)
+        self.assertTrue(np.array_equal(post, should))
+
+    def test_artifact_hashing(self):
+        model = HashingOvRModel(LogisticRegression(), threshold=0.4, n_features=2**12)
+        model.fit(pd.Series(TEXTS), GENRES)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_artifact(model, tmp_dir)
+            mod = Model.load(tmp_dir)
+            texts = pd.Series(TEXTS + ['alien love', 'bank robbers in space'])
+            self.assertTrue(np.array_equal(mod.predict(texts), model.predict(texts)))
+            self.assertEqual(mod.coef.shape, (2**12, 6))
+
+    def test_artifact_float32(self):
+        texts = pd.Series(TEXTS + ['alien love', 'bank robbers in space'])
+        self.model.compile(dtype=np.float32)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_artifact(self.model, tmp_dir)
+            mod = Model.load(tmp_dir)
+            self.assertEqual(mod.coef.dtype, np.float32)
+            self.assertTrue(np.array_equal(mod.predict(texts), self.model.predict(texts)))
+
+    def test_artifact_compressed(self):
+        texts = pd.Series(TEXTS + ['alien love', 'bank robbers in space'])
+        should = self.model.predict_proba(texts)
+        report = self.model.compress(cutoff=1e-3, int8=True)
+        self.assertEqual(self.model.coef.dtype, np.int8)
+        self.assertLessEqual(report['terms'][1], report['terms'][0])
+        self.assertLess(report['bytes'][1], report['bytes'][0])
+        self.assertTrue(np.allclose(self.model.predict_proba(texts), should, atol=0.02))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_artifact(self.model, tmp_dir)
+            mod = Model.load(tmp_dir)
+            self.assertEqual(mod.coef.dtype, np.int8)
+            self.assertTrue(np.array_equal(mod.predict(texts), self.model.predict(texts)))
+
+    def test_artifact_compressed_old_model(self):
+        # models pickled before the fused weights existed have none of the compiled attributes
+        texts = pd.Series(TEXTS + ['alien love', 'bank robbers in space'])
+        should = self.model.predict(texts)
+        del self.model.coef, self.model.intercept, self.model.coef_scale
+        report = self.model.compress(cutoff=None)
+        self.assertEqual(report['terms'][0], report['terms'][1])
+        self.assertEqual(self.model.coef.dtype, np.float64)
+        self.assertTrue(np.array_equal(self.model.predict(texts), should))
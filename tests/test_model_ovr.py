@@ -1,9 +1,14 @@
+import tempfile
 import unittest
+import numpy as np
 import pandas as pd
 from movieclassifier.model.Model import Model
 from movieclassifier.model.OvRModel import OvRModel
+from movieclassifier.model.hashing import HashingTfidfVectorizer
+from movieclassifier.model.feature_cache import FeatureCache
+from movieclassifier.model.linear import SGD_LOG_LOSS
 from sklearn.datasets import make_multilabel_classification
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import f1_score
 from tests import PROJECT_ROOT
@@ -42,3 +47,92 @@ class TestModelOvR(unittest.TestCase):
         score = f1_score(self.y_test, ypred, average='micro')
         self.assertGreater(score, 0.5)
 
+    def test_fused_predict_proba(self):
+        self.assertIsNotNone(self.model.coef)
+        post = self.model.predict_proba(self.x_test)
+        should = self.model.clf.predict_proba(self.x_test)
+        self.assertTrue(np.allclose(post, should))
+
+    def test_fused_float32(self):
+        should = self.model.predict_proba(self.x_test)
+        self.model.compile(dtype=np.float32)
+        post = self.model.predict_proba(self.x_test)
+        self.assertEqual(self.model.coef.dtype, np.float32)
+        self.assertTrue(np.allclose(post, should, atol=1e-4))
+
+    def test_parallel_fit(self):
+        estimator = LogisticRegression(solver='saga', max_iter=1000, random_state=0)
+        serial = OvRModel(estimator, threshold=0.3, test_mode=True)
+        serial.fit(self.x_train, self.y_train)
+        parallel = OvRModel(estimator, threshold=0.3, test_mode=True, n_jobs=2)
+        parallel.fit(self.x_train, self.y_train)
+        self.assertTrue(np.allclose(parallel.predict_proba(self.x_test), serial.predict_proba(self.x_test)))
+
+    def test_partial_fit_new_genres(self):
+        x = pd.Series(['alien planet spaceship', 'love kiss wedding', 'alien robot future', \
+            'love heart marriage', 'haunted demon curse', 'demon blood nightmare'])
+        y = [['Science Fiction'], ['Romance'], ['Science Fiction'], ['Romance'], ['Horror'], ['Horror']]
+        model = OvRModel(SGDClassifier(loss=SGD_LOG_LOSS, random_state=0), threshold=0.5, \
+            vectorizer=HashingTfidfVectorizer(n_features=2**10))
+        model.partial_fit(x[:4], y[:4])
+        self.assertEqual(list(model.binarizer.classes_), ['Romance', 'Science Fiction'])
+        for _ in range(20):
+            model.partial_fit(x, y)
+        self.assertEqual(list(model.binarizer.classes_), ['Horror', 'Romance', 'Science Fiction'])
+        self.assertEqual(model.predict_labels(['demon curse']), [('Horror',)])
+
+    def test_hashing_unseen_terms(self):
+        vectorizer = HashingTfidfVectorizer(n_features=2**10, smooth_idf=False)
+        vectorizer.fit(['alien planet spaceship', 'love kiss wedding'])
+        X = vectorizer.transform(['alien zombie apocalypse', 'zombie'])
+        self.assertTrue(np.isfinite(vectorizer.idf_).all())
+        self.assertTrue(np.isfinite(X.toarray()).all())
+        self.assertAlmostEqual(np.linalg.norm(X[1].toarray()), 1.0)
+
+    def test_save_load_fused(self):
+        self.model.compile(dtype=np.float32)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.model.save(tmp_dir + '/model.hal')
+            mod = Model.load(tmp_dir + '/model.hal')
+        self.assertEqual(mod.coef.dtype, np.float32)
+        self.assertTrue(np.array_equal(mod.predict(self.x_test), self.model.predict(self.x_test)))
+
+    def test_feature_cache(self):
+        x = pd.Series(['alien planet spaceship', 'love kiss wedding', 'alien robot future', \
+            'love heart marriage', 'haunted demon curse', 'demon blood nightmare'])
+        y = [['Science Fiction'], ['Romance'], ['Science Fiction'], ['Romance'], ['Horror'], ['Horror']]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = FeatureCache(tmp_dir)
+            should = OvRModel(LogisticRegression(solver='saga', max_iter=1000, random_state=0), threshold=0.3)
+            should.fit(x, y, feature_cache=cache)
+            post = OvRModel(LogisticRegression(solver='saga', max_iter=1000, random_state=0), threshold=0.3)
+            post.fit(x, y, feature_cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+            # other vectorizer parameters are another entry
+            other = OvRModel(LogisticRegression(solver='saga', max_iter=1000, random_state=0), threshold=0.3, \
+                vectorizer=HashingTfidfVectorizer(n_features=2**10))
+            other.fit(x, y, feature_cache=cache)
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertEqual(list(post.binarizer.classes_), list(should.binarizer.classes_))
+        self.assertTrue(np.allclose(post.predict_proba(x), should.predict_proba(x)))
+
+    def test_tune_thresholds(self):
+        x_train, x_val, y_train, y_val = train_test_split(self.x_train, self.y_train, test_size=0.3, random_state=0)
+        model = OvRModel(LogisticRegression(solver='saga', max_iter=1000, random_state=0), threshold=0.3, \
+            test_mode=True)
+        model.fit(x_train, y_train)
+        before = f1_score(y_val, model.predict(x_val), average='micro')
+
+        score = model.tune_thresholds(x_val, y_val, average='micro')
+        self.assertEqual(model.threshold.shape, (y_val.shape[1],))
+        self.assertAlmostEqual(score, f1_score(y_val, model.predict(x_val), average='micro'))
+        self.assertGreaterEqual(score, before)
+
+        # the macro F1 is maximized independently for each genre
+        score = model.tune_thresholds(x_val, y_val, average='macro')
+        proba = model.predict_proba(x_val)
+        for g in range(y_val.shape[1]):
+            best = max(f1_score(y_val[:, g], proba[:, g] >= t) for t in np.round(np.arange(0.01, 1.0, 0.01), 2))
+            self.assertAlmostEqual(f1_score(y_val[:, g], proba[:, g] >= model.threshold[g]), best)
+        self.assertAlmostEqual(score, f1_score(y_val, model.predict(x_val), average='macro'))
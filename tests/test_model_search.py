@@ -0,0 +1,41 @@
+import unittest
+import pandas as pd
+from movieclassifier.model.OvRModel import OvRModel
+from movieclassifier.model.search import search, search_candidates, build_model
+
+TEXTS = ['space crew hunted deadly alien creature', 'research team antarctica hunted shape shifting alien', \
+    'bookshop owner falls love famous actress', 'eight couples fall love weeks christmas london', \
+    'detective hunts group professional bank robbers', 'aging patriarch crime dynasty transfers control son']
+GENRES = [['Horror', 'Science Fiction'], ['Horror', 'Science Fiction'], ['Comedy', 'Romance'], \
+    ['Comedy', 'Romance'], ['Crime', 'Drama'], ['Crime', 'Drama']]
+SPACE = {
+    'vectorizer': {'max_df': [0.8, 1.0]},
+    'estimators': {'LogisticRegression': {'C': [1.0, 10.0]}, 'LinearSVC': {'C': [1.0]}},
+    'threshold': [0.2, 0.4],
+}
+
+class TestModelSearch(unittest.TestCase):
+
+    def test_search_candidates(self):
+        grid = search_candidates(SPACE)
+        self.assertEqual(len(grid), 6)
+        self.assertIn(({'max_df': 1.0}, 'LinearSVC', {'C': 1.0}), grid)
+        sampled = search_candidates(SPACE, n_iter=4, random_seed=0)
+        self.assertEqual(len(sampled), 4)
+        self.assertTrue(all(candidate in grid for candidate in sampled))
+        self.assertEqual(sampled, search_candidates(SPACE, n_iter=4, random_seed=0))
+
+    def test_search(self):
+        x = pd.Series(TEXTS * 3)
+        y = GENRES * 3
+        results = search(x, y, SPACE, n_splits=3, n_jobs=2)
+        # one row per threshold of the logistic regressions, one for the LinearSVC
+        self.assertEqual(len(results), 2 * 2 * 2 + 2)
+        scores = [result['F1 score'] for result in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(sum(result['threshold'] is None for result in results), 2)
+
+        model = build_model(results[0])
+        self.assertIsInstance(model, OvRModel)
+        model.fit(x, y)
+        self.assertEqual(model.predict(x).shape, (len(x), 6))
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+import prepare_data
+from movieclassifier.preprocessing.data_preprocessing import process_data, row_hashes, save_data
+from benchmarks.synthetic import make_raw_data
+
+def fake_process_overviews(texts, workers=1, lemmatise=False, pool=None):
+    texts = list(texts)
+    fake_process_overviews.processed.extend(texts)
+    return [text.lower() + (' lemmatised' if lemmatise else '') for text in texts]
+
+class TestIncrementalETL(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(prepare_data, 'process_overviews', fake_process_overviews)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        fake_process_overviews.processed = []
+
+        # the raw data of the previous run
+        self.raw = make_raw_data(200)
+        # the raw data of this run: deleted, modified and inserted rows
+        kept = process_data(self.raw).index
+        self.deleted = list(kept[:10])
+        self.modified = list(kept[10:15])
+        new = self.raw.drop(index=self.deleted)
+        new.loc[self.modified, 'overview'] = new.loc[self.modified, 'overview'] + ' Again.'
+        inserted = self.raw.loc[kept[20:25]].copy()
+        inserted['title'] = inserted['title'] + ' II'
+        inserted['overview'] = 'The sequel. ' + inserted['overview']
+        self.new = pd.concat([new, inserted], ignore_index=True)
+        self.changed = sorted(list(new.loc[self.modified, 'overview']) + list(inserted['overview']))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def save_run(self, df, hashes, path_save, lemmatise=False):
+        save_data(df, path_save)
+        prepare_data.save_rows(prepare_data.rows_path(path_save), hashes, prepare_data.processing_settings(lemmatise), \
+            prepare_data.output_fingerprint(path_save))
+
+    def full_run(self, raw, path_save):
+        hashes = row_hashes(raw)
+        df = prepare_data.ETL(raw.copy())
+        self.save_run(df, hashes.loc[df.index].to_numpy(), path_save)
+
+    def test_incremental_ETL(self):
+        for name in ['movies_data_ready', 'movies_data_ready.csv']:
+            with self.subTest(name=name):
+                path_save = os.path.join(self.tmp_dir.name, name)
+                self.full_run(self.raw, path_save)
+
+                fake_process_overviews.processed = []
+                post, hashes = prepare_data.incremental_ETL(self.new.copy(), path_save)
+                # only the inserted and modified rows are processed
+                self.assertEqual(sorted(fake_process_overviews.processed), self.changed)
+                should = prepare_data.ETL(self.new.copy())
+                pd.testing.assert_frame_equal(post, should)
+                self.assertTrue((hashes == row_hashes(self.new).loc[should.index].to_numpy()).all())
+
+                # the next incremental run, with the same data, processes nothing
+                self.save_run(post, hashes, path_save)
+                fake_process_overviews.processed = []
+                post, _ = prepare_data.incremental_ETL(self.new.copy(), path_save)
+                self.assertEqual(fake_process_overviews.processed, [])
+                pd.testing.assert_frame_equal(post, should)
+
+    def test_incremental_ETL_settings(self):
+        path_save = os.path.join(self.tmp_dir.name, 'movies_data_ready')
+        self.full_run(self.raw, path_save)
+
+        # the overviews processed with other settings are not reused
+        fake_process_overviews.processed = []
+        post, _ = prepare_data.incremental_ETL(self.new.copy(), path_save, lemmatise=True)
+        self.assertEqual(len(fake_process_overviews.processed), len(post))
+        should = prepare_data.ETL(self.new.copy(), lemmatise=True)
+        pd.testing.assert_frame_equal(post, should)
+
+    def test_incremental_ETL_same_stem(self):
+        # the previous run of an output is not mistaken for the one of another output
+        path_save = os.path.join(self.tmp_dir.name, 'ready')
+        self.full_run(self.raw, path_save)
+        self.full_run(self.new, path_save + '.csv')
+        self.assertNotEqual(prepare_data.rows_path(path_save), prepare_data.rows_path(path_save + '.csv'))
+
+        fake_process_overviews.processed = []
+        post, _ = prepare_data.incremental_ETL(self.new.copy(), path_save)
+        self.assertEqual(sorted(fake_process_overviews.processed), self.changed)
+        pd.testing.assert_frame_equal(post, prepare_data.ETL(self.new.copy()))
+
+    def test_incremental_ETL_output_changed(self):
+        # the output was overwritten since its row hashes were saved
+        path_save = os.path.join(self.tmp_dir.name, 'ready.csv')
+        self.full_run(self.raw, path_save)
+        stale = prepare_data.ETL(self.raw.copy())
+        stale['overview'] = stale['overview'] + ' stale'
+        save_data(stale, path_save)
+
+        fake_process_overviews.processed = []
+        post, _ = prepare_data.incremental_ETL(self.raw.copy(), path_save)
+        self.assertEqual(len(fake_process_overviews.processed), len(post))
+        pd.testing.assert_frame_equal(post, prepare_data.ETL(self.raw.copy()))
+
+    def test_incremental_ETL_no_previous_run(self):
+        path_save = os.path.join(self.tmp_dir.name, 'movies_data_ready')
+        post, _ = prepare_data.incremental_ETL(self.new.copy(), path_save)
+        self.assertEqual(len(fake_process_overviews.processed), len(post))
+        should = prepare_data.ETL(self.new.copy())
+        pd.testing.assert_frame_equal(post, should)
+
+if __name__ == '__main__':
+    unittest.main()
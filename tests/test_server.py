@@ -0,0 +1,60 @@
+import json
+import threading
+import unittest
+import urllib.request
+from urllib.error import HTTPError
+from movieclassifier.serving.server import PredictionServer
+
+class ConstantModel:
+
+    def predict_single(self, title, description, verbose=False):
+        return ('Drama', 'Crime')
+
+class FailingModel:
+
+    def predict_single(self, title, description, verbose=False):
+        raise RuntimeError('corrupted model')
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = PredictionServer(('127.0.0.1', 0), ConstantModel(), quiet=True)
+        self.url = 'http://127.0.0.1:' + str(self.server.server_address[1])
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _post(self, data):
+        request = urllib.request.Request(self.url + '/predict', data=data, method='POST')
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_predict(self):
+        data = json.dumps({'title': 'Heat', 'description': 'A group of thieves.'}).encode('utf8')
+        post = self._post(data)
+        should = {'title': 'Heat', 'description': 'A group of thieves.', 'genre': ['Drama', 'Crime']}
+        self.assertEqual(post, should)
+
+    def test_bad_request(self):
+        with self.assertRaises(HTTPError) as context:
+            self._post(b'{"title": "Heat"}')
+        self.assertEqual(context.exception.code, 400)
+
+    def test_bad_request_types(self):
+        for data in (b'{"title": 1, "description": null}', b'{"title": "Heat", "description": ["thieves"]}', b'[1, 2]'):
+            with self.assertRaises(HTTPError) as context:
+                self._post(data)
+            self.assertEqual(context.exception.code, 400)
+
+    def test_prediction_error(self):
+        self.server.model = FailingModel()
+        data = json.dumps({'title': 'Heat', 'description': 'A group of thieves.'}).encode('utf8')
+        with self.assertRaises(HTTPError) as context:
+            self._post(data)
+        self.assertEqual(context.exception.code, 500)
+        self.assertEqual(json.loads(context.exception.read()), {'error': 'prediction failed'})
+        # the server still answers the next requests
+        self.server.model = ConstantModel()
+        self.assertEqual(self._post(data)['genre'], ['Drama', 'Crime'])
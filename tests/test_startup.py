@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import unittest
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from movieclassifier.model.OvRModel import OvRModel
+from movieclassifier.model.artifact import save_artifact
+from tests import PROJECT_ROOT
+
+# maximum seconds to load an artifact and predict a movie (sklearn alone takes more than a second)
+PREDICT_BUDGET = 1.0
+HEAVY_MODULES = ['sklearn', 'pandas', 'nltk', 'inflect', 'scipy.special']
+
+# a description without numbers: converting a number to words imports inflect
+PREDICT_SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+from movieclassifier.model.Model import Model
+model = Model.load(%r)
+labels = model.predict_single('Heat', 'A group of professional bank robbers start to feel the heat from the police.')
+elapsed = time.perf_counter() - start
+print(json.dumps({'elapsed': elapsed, 'labels': list(labels), 'modules': [m for m in %r if m in sys.modules]}))
+"""
+
+TEXTS = ['heat group professional bank robbers feel heat police', 'alien crew spaceship hunted creature', \
+    'love story couple falls love', 'detective hunts robbers city']
+GENRES = [['Crime'], ['Science Fiction'], ['Romance'], ['Crime']]
+
+class TestStartup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        model = OvRModel(LogisticRegression(), threshold=0.3)
+        model.fit(pd.Series(TEXTS), GENRES)
+        save_artifact(model, cls.tmp_dir.name)
+        cls.script = PREDICT_SCRIPT % (cls.tmp_dir.name, HEAVY_MODULES)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def run_script(self, script):
+        env = dict(os.environ, PYTHONPATH=os.path.join(PROJECT_ROOT, 'src'))
+        output = subprocess.run([sys.executable, '-c', script], env=env, check=True, \
+            stdout=subprocess.PIPE).stdout
+        return json.loads(output.decode().splitlines()[-1])
+
+    def test_inference_imports(self):
+        result = self.run_script(self.script)
+        self.assertIn('Crime', result['labels'])
+        self.assertEqual(result['modules'], [])
+
+    def test_predict_time_budget(self):
+        # best of a few runs, to ignore a cold disk cache
+        elapsed = min(self.run_script(self.script)['elapsed'] for _ in range(3))
+        self.assertLess(elapsed, PREDICT_BUDGET)
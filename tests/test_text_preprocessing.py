@@ -1,5 +1,13 @@
 import unittest
+import os
+import tempfile
+import nltk
+import pandas as pd
 import movieclassifier.preprocessing.text_preprocessing as tp
+import movieclassifier.preprocessing.data_preprocessing as datp
+from tests import PROJECT_ROOT
+
+FILE_PATH = PROJECT_ROOT + '/data/movies_metadata.csv'
 
 class TestTextPreprocessing(unittest.TestCase):
 
@@ -44,3 +52,68 @@ class TestTextPreprocessing(unittest.TestCase):
         
         post = tp.process_text(text)
         self.assertEqual(post, should)
+
+    def test_pipeline_process_many(self):
+        texts = ['The 2 Towers', 'In 1947 Portland, Maine, banker Andy Dufresne is convicted.']
+        pipeline = tp.TextPipeline()
+        post = pipeline.process_many(texts)
+        should = ['two towers', 'one thousand nine hundred and forty-seven portland maine banker andy dufresne convicted']
+        self.assertEqual(post, should)
+
+    def test_process_series(self):
+        texts = pd.Series(['James Bond must unmask the mysterious head of the Janus Syndicate.', \
+            'In 1947 Portland, Maine, the banker cannot escape: 2,000 days in jail!', \
+            'Crème brûlée-loving chefs wanna cook', '', '...'], index=[3, 1, 4, 1, 5])
+        post = tp.process_series(texts)
+        should = [tp.process_text(text) for text in texts]
+        self.assertEqual(list(post), should)
+        self.assertEqual(list(post.index), [3, 1, 4, 1, 5])
+
+    def test_memo_tables(self):
+        pipeline = tp.TextPipeline(memo_size=2)
+        post = pipeline.replace_nums2words(['3', 'days', '3', '14', '7'])
+        self.assertEqual(post, ['three', 'days', 'three', 'fourteen', 'seven'])
+        self.assertEqual(pipeline.number_words.stats()['hits'], 1)
+        self.assertEqual(pipeline.number_words.stats()['misses'], 3)
+        # bounded: the least recently used number is evicted
+        self.assertEqual(len(pipeline.number_words), 2)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, 'movies.memo')
+            pipeline.save_memo(file_path)
+            warm = tp.TextPipeline()
+            warm.load_memo(file_path)
+        self.assertEqual(warm.replace_nums2words(['7', '14']), ['seven', 'fourteen'])
+        self.assertEqual(warm.number_words.stats()['misses'], 0)
+
+    def test_memo_updates(self):
+        pipeline = tp.TextPipeline()
+        pipeline.replace_nums2words(['3', '3'])
+        updates = pipeline.pop_memo_updates()['number_words']
+        self.assertEqual((updates['entries'], updates['hits'], updates['misses']), ({'3': 'three'}, 1, 1))
+        # the counts merged from a worker are not popped again, i.e. by the next worker forked
+        pipeline.update_memo({'number_words': {'entries': {'4': 'four'}, 'hits': 5, 'misses': 1}})
+        self.assertEqual(pipeline.number_words.stats()['hits'], 6)
+        updates = pipeline.pop_memo_updates()['number_words']
+        self.assertEqual((updates['entries'], updates['hits'], updates['misses']), ({}, 0, 0))
+
+    def test_regex_tokenize(self):
+        texts = ['james bond must unmask the mysterious head', 'i cannot stop gonna wanna', \
+            'gotta lemme gimme wanna', 'tabs\tand\nnew lines  2 000', '', '   ']
+        for text in texts:
+            self.assertEqual(tp.regex_tokenize(text), nltk.word_tokenize(text))
+
+    def test_regex_tokenize_corpus(self):
+        # same tokens of nltk.word_tokenize on every overview of the MovieLens dataset,
+        # after the steps before the tokenization
+        df = datp.process_data(datp.load_data(FILE_PATH))
+        for overview in df['overview']:
+            text = tp.remove_specials(tp.to_ascii(tp.to_lower(overview)))
+            self.assertEqual(tp.regex_tokenize(text), nltk.word_tokenize(text))
+
+    def test_nltk_tokenizer(self):
+        texts = ['In 1947 Portland, the banker cannot escape: 2,000 days in jail!', 'Wanna cook?']
+        pipeline = tp.TextPipeline(tokenizer=tp.NLTK)
+        post = [pipeline.process(text) for text in texts]
+        self.assertEqual(post, [tp.process_text(text) for text in texts])
+        self.assertEqual(list(pipeline.process_series(pd.Series(texts))), post)